@@ -1,7 +1,4 @@
 import streamlit as st
-from datetime import date
-import calendar
-from pathlib import Path
 import csv
 import os
 
@@ -17,19 +14,36 @@ st.set_page_config(
     layout="centered"
 )
 
-# Load Custom CSS
-def load_css():
-    css_path = Path(__file__).parent / "styles.css"
-    with open(css_path, "r") as f:
-        st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+# Load Custom CSS (read and minified once per process, see assets.py)
+from assets import inject_css
 
-load_css()
+inject_css()
+
+# ==========================================
+# Survey Selection
+# ==========================================
+from selection import Selection
+from survey import get_survey
+
+# One server process hosts every survey: ?survey=<id> picks one,
+# no parameter means the default survey.
+try:
+    survey = get_survey(st.query_params.get("survey"))
+except KeyError:
+    st.error("This survey does not exist. Please check your link.")
+    st.stop()
 
 # ==========================================
 # State Management
 # ==========================================
-if 'selected_dates' not in st.session_state:
-    st.session_state.selected_dates = []
+# Session state belongs to one survey; start over if the survey changed
+if st.session_state.get('survey_id') != survey.id:
+    for key in ('selection', 'user_name', 'submitted', 'view_only', 'live_stats'):
+        st.session_state.pop(key, None)
+    st.session_state.survey_id = survey.id
+
+if 'selection' not in st.session_state:
+    st.session_state.selection = Selection(survey)
 
 if 'user_name' not in st.session_state:
     st.session_state.user_name = ""
@@ -43,33 +57,37 @@ if 'view_only' not in st.session_state:
 # ==========================================
 # Helper Functions
 # ==========================================
-import pandas as pd
+from storage import get_store, StorageError, CSV_COLUMNS
+from stats import get_stats, get_notifier
+import metrics
+import time
+
+# Opt-in instrumentation (see metrics.py); a no-op unless configured
+metrics.start_exporters()
+
+store = get_store(survey.data_dir)
 
-DATA_FILE = Path("data/submissions.csv")
+# Open results pages check for new votes every LIVE_REFRESH_SECONDS (0 = off).
+# After a change they wait until no vote arrived for LIVE_DEBOUNCE_SECONDS,
+# but never longer than LIVE_MAX_DELAY_SECONDS, so a burst of submits
+# causes a few re-renders instead of one per vote.
+LIVE_REFRESH_SECONDS = float(os.environ.get("DINNER_SURVEY_LIVE_SECONDS", "3"))
+LIVE_DEBOUNCE_SECONDS = 1.0
+LIVE_MAX_DELAY_SECONDS = 10.0
 
+# Page sizes of the admin table, and how many names the delete selector offers
+ADMIN_PAGE_SIZES = [25, 100, 500]
+ADMIN_DELETE_OPTIONS = 50
+
+@metrics.timed("function_seconds", function="load_user_data")
 def load_user_data(name):
     """Loads previous submission for the user if it exists."""
-    if not DATA_FILE.exists():
-        return
-    
     try:
-        df = pd.read_csv(DATA_FILE)
-        # Filter by name (case-insensitive? let's do exact match for now to be safe, or strip)
-        user_row = df[df["Name"] == name]
+        last_entry = store.get(name)
         
-        if not user_row.empty:
-            # Get the last entry if multiple (though we try to overwrite)
-            last_entry = user_row.iloc[-1]
-            
-            loaded_dates = []
-            for col in ["Date 1", "Date 2", "Date 3"]:
-                if pd.notna(last_entry[col]) and last_entry[col] != "":
-                    try:
-                        loaded_dates.append(date.fromisoformat(last_entry[col]))
-                    except ValueError:
-                        pass
-            
-            st.session_state.selected_dates = loaded_dates
+        if last_entry is not None:
+            # Days that are no longer selectable in the survey are dropped
+            st.session_state.selection = Selection.from_iso(survey, last_entry.dates)
             # If we loaded data, maybe we should show the result page directly? 
             # Or let them edit? User said "read previous selection and let them modify".
             # So we stay on the survey page but pre-fill the data.
@@ -78,128 +96,108 @@ def load_user_data(name):
     except Exception as e:
         print(f"Error loading data: {e}")
 
-def save_submission(name, dates):
-    """Saves the submission to a CSV file. Overwrites previous entry for the same name."""
-    # Ensure data directory exists
-    DATA_FILE.parent.mkdir(parents=True, exist_ok=True)
-    
-    # Prepare new row data
-    date_strs = [d.strftime("%Y-%m-%d") for d in dates]
-    while len(date_strs) < 3:
-        date_strs.append("")
-        
-    from datetime import datetime
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    new_row = {"Name": name, "Date 1": date_strs[0], "Date 2": date_strs[1], "Date 3": date_strs[2], "Timestamp": timestamp}
-    
-    # Check if file exists
-    if DATA_FILE.exists():
-        try:
-            df = pd.read_csv(DATA_FILE)
-            # Remove existing entries for this user
-            df = df[df["Name"] != name]
-            # Append new row
-            new_df = pd.DataFrame([new_row])
-            df = pd.concat([df, new_df], ignore_index=True)
-        except Exception:
-            # If read fails, just overwrite/create new
-            df = pd.DataFrame([new_row])
-    else:
-        df = pd.DataFrame([new_row])
-        
-    df.to_csv(DATA_FILE, index=False)
+@metrics.timed("function_seconds", function="save_submission")
+def save_submission(name, selection):
+    """Saves the submission to the store. Overwrites previous entry for the same name."""
+    store.upsert(name, selection.to_iso())
+
+def stats_outdated(shown, now):
+    """
+    True if the stats `shown` (version, stats, shown at) should be replaced:
+    the data changed and the burst of writes settled, or waited long enough.
+    An unchanged store costs one attribute read.
+    """
+    version, changed_at = get_notifier(store).current()
+    return shown[0] != version and (
+        now - changed_at >= LIVE_DEBOUNCE_SECONDS or now - shown[2] >= LIVE_MAX_DELAY_SECONDS
+    )
 
+def live_stats():
+    """Returns the stats this session shows, fetching new ones when they are outdated."""
+    shown = st.session_state.get('live_stats')  # (version, stats, shown at)
+    now = time.monotonic()
+    if shown is None or stats_outdated(shown, now):
+        shown = (get_notifier(store).current()[0], get_stats(store), now)
+        st.session_state.live_stats = shown
+    return shown[1]
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS or None)
+def watch_statistics():
+    """
+    Draws nothing: checks every LIVE_REFRESH_SECONDS whether the stats on
+    screen are outdated and only then reruns the page, so an idle results
+    page costs a version check per tick instead of a re-render.
+    """
+    shown = st.session_state.get('live_stats')
+    if shown is not None and stats_outdated(shown, time.monotonic()):
+        st.rerun()
+
+@metrics.timed("function_seconds", function="render_statistics")
 def render_statistics():
-    """Renders the public statistics section."""
+    """
+    Renders the public statistics section. Open results pages follow new
+    votes without a page refresh (see watch_statistics).
+    """
     st.subheader("📊 Current Voting Results")
     
-    if DATA_FILE.exists():
-        try:
-            df = pd.read_csv(DATA_FILE)
-            date_cols = [col for col in df.columns if "Date" in col]
+    try:
+        stats = live_stats()
+        
+        if stats.counts:
+            # --- Top 3 Display ---
+            st.markdown("##### 🏆 Top 3 Popular Dates")
             
-            if date_cols:
-                # Melt to get Date -> Name mapping
-                # We need to keep the Name column when melting
-                all_votes = df.melt(id_vars=["Name"], value_vars=date_cols, value_name="Selected Date").dropna()
-                all_votes = all_votes[all_votes["Selected Date"] != ""]
+            cols = st.columns(3)
+            for i, (day, votes) in enumerate(stats.top(3)):
+                with cols[i]:
+                    st.metric(label=f"Rank #{i+1}", value=day, delta=f"{votes} votes")
+            
+            # --- Best Pair ---
+            # Two dinners: the pair of dates that the most voters can join at least once
+            pair, covered = stats.best_cover(survey.selectable_iso, 2)
+            if len(pair) == 2 and covered:
+                voted = stats.matrix(survey.selectable_iso).voters
+                st.caption(f"🤝 Best pair of dates: **{pair[0]}** and **{pair[1]}** — "
+                           f"{covered} of {voted} voters can make at least one.")
+            
+            st.markdown("<br>", unsafe_allow_html=True)
+            
+            # --- Full List Display ---
+            with st.expander("📅 View All Dates & Votes", expanded=True):
+                # All selectable days of the survey, precomputed once per process
+                valid_days = survey.selectable_iso
                 
-                if not all_votes.empty:
-                    # Count votes
-                    vote_counts = all_votes["Selected Date"].value_counts().reset_index()
-                    vote_counts.columns = ["Date", "Votes"]
-                    
-                    # Aggregate voters per date
-                    voters_per_date = all_votes.groupby("Selected Date")["Name"].apply(lambda x: ", ".join(x)).reset_index()
-                    voters_per_date.columns = ["Date", "Voters"]
-                    
-                    # --- Top 3 Display ---
-                    st.markdown("##### 🏆 Top 3 Popular Dates")
-                    top_3 = vote_counts.sort_values(by="Votes", ascending=False).head(3)
-                    
-                    cols = st.columns(3)
-                    for i, (index, row) in enumerate(top_3.iterrows()):
-                        if i < 3:
-                            with cols[i]:
-                                st.metric(label=f"Rank #{i+1}", value=row['Date'], delta=f"{row['Votes']} votes")
-                    
-                    st.markdown("<br>", unsafe_allow_html=True)
-                    
-                    # --- Full List Display ---
-                    with st.expander("📅 View All Dates & Votes", expanded=True):
-                        # Generate all valid workdays for Jan 2026
-                        import calendar
-                        TARGET_YEAR = 2026
-                        TARGET_MONTH = 1
-                        HOLIDAYS = [date(2026, 1, 1), date(2026, 1, 2)]
-                        
-                        def is_workday_local(d):
-                            if d.weekday() >= 5: return False
-                            if d in HOLIDAYS: return False
-                            return True
-                            
-                        num_days = calendar.monthrange(TARGET_YEAR, TARGET_MONTH)[1]
-                        all_days = [date(TARGET_YEAR, TARGET_MONTH, day) for day in range(1, num_days + 1)]
-                        valid_days = [d.strftime("%Y-%m-%d") for d in all_days if is_workday_local(d)]
-                        
-                        # Create a dataframe for all valid days
-                        full_stats = pd.DataFrame({"Date": valid_days})
-                        
-                        # Merge with vote counts
-                        full_stats = full_stats.merge(vote_counts, on="Date", how="left")
-                        full_stats["Votes"] = full_stats["Votes"].fillna(0).astype(int)
-                        
-                        # Merge with voters list
-                        full_stats = full_stats.merge(voters_per_date, on="Date", how="left")
-                        full_stats["Voters"] = full_stats["Voters"].fillna("")
-                        
-                        # Calculate height to show all rows (approx 35px per row + header)
-                        # Adding a little buffer
-                        table_height = (len(full_stats) + 1) * 35 + 3
-                        
-                        st.dataframe(
-                            full_stats,
-                            column_config={
-                                "Date": "Date",
-                                "Votes": st.column_config.ProgressColumn(
-                                    "Votes",
-                                    help="Number of votes",
-                                    format="%d",
-                                    min_value=0,
-                                    max_value=int(full_stats["Votes"].max()) if not full_stats.empty else 10,
-                                ),
-                                "Voters": st.column_config.TextColumn(
-                                    "Voters",
-                                    help="Who voted for this date",
-                                    width="large"
-                                )
-                            },
-                            hide_index=True,
-                            use_container_width=True,
-                            height=table_height
+                full_stats = stats.table(valid_days)
+                
+                # Calculate height to show all rows (approx 35px per row + header)
+                # Adding a little buffer
+                table_height = (len(valid_days) + 1) * 35 + 3
+                
+                st.dataframe(
+                    full_stats,
+                    column_config={
+                        "Date": "Date",
+                        "Votes": st.column_config.ProgressColumn(
+                            "Votes",
+                            help="Number of votes",
+                            format="%d",
+                            min_value=0,
+                            max_value=max(full_stats["Votes"], default=10),
+                        ),
+                        "Voters": st.column_config.TextColumn(
+                            "Voters",
+                            help="Who voted for this date",
+                            width="large"
                         )
-        except Exception as e:
-            st.error(f"Error loading statistics: {e}")
+                    },
+                    hide_index=True,
+                    use_container_width=True,
+                    height=table_height
+                )
+    except Exception as e:
+        st.error(f"Error loading statistics: {e}")
+    
+    watch_statistics()
 
 def render_admin():
     """Renders the admin panel."""
@@ -240,19 +238,23 @@ def render_admin():
             
         st.markdown("---")
         
-        if DATA_FILE.exists():
+        st.subheader("📋 Survey Data Management")
+        st.info("Admin Panel is for data management only. Public statistics are visible on the main result page.")
+        
+        try:
+            total = store.count()
+        except StorageError as e:
+            # Unreadable data (e.g. a CSV file with bad columns): clearing it is still possible
+            st.error(f"Error reading data: {e}")
+            total = None
+        if total:
             try:
-                df = pd.read_csv(DATA_FILE)
-                st.subheader("📋 Survey Data Management")
-                st.info("Admin Panel is for data management only. Public statistics are visible on the main result page.")
-                
-                st.dataframe(df, use_container_width=True)
+                name_prefix = render_admin_table(total)
                 
-                # Download Button
-                csv = df.to_csv(index=False).encode('utf-8')
+                # Download Button: the export is only built when clicked
                 st.download_button(
                     "📥 Download CSV",
-                    csv,
+                    store.export_csv_bytes,
                     "submissions.csv",
                     "text/csv",
                     key='download-csv'
@@ -260,35 +262,127 @@ def render_admin():
                 
                 st.markdown("---")
                 
-                # Delete Individual Records
+                # Delete Individual Records: options come from an indexed
+                # prefix search, never from the whole table
                 st.subheader("🗑️ Delete Specific Records")
+                options = store.search_names(name_prefix, ADMIN_DELETE_OPTIONS)
                 users_to_delete = st.multiselect(
                     "Select users to remove:",
-                    options=df["Name"].unique(),
+                    options=options,
                     placeholder="Choose names..."
                 )
+                if len(options) == ADMIN_DELETE_OPTIONS:
+                    st.caption(f"Showing the first {ADMIN_DELETE_OPTIONS} names. Search by name above to find others.")
                 
                 if users_to_delete:
                     if st.button(f"Delete {len(users_to_delete)} Selected Record(s)", type="primary"):
-                        # Filter out selected users
-                        new_df = df[~df["Name"].isin(users_to_delete)]
-                        new_df.to_csv(DATA_FILE, index=False)
+                        store.delete(users_to_delete)
                         st.success(f"Deleted records for: {', '.join(users_to_delete)}")
                         st.rerun()
-                
-                st.markdown("---")
-                
-                # Reset Data Option
-                with st.expander("⚠️ Danger Zone (Clear All)"):
-                    if st.button("🔥 Clear ENTIRE Database"):
-                        DATA_FILE.unlink()
-                        st.warning("All data has been wiped!")
-                        st.rerun()
                         
             except Exception as e:
                 st.error(f"Error reading data: {e}")
-        else:
+        elif total == 0:
             st.info("No submissions yet.")
+        
+        if total != 0:
+            st.markdown("---")
+            
+            # Reset Data Option: outside the try, so it stays reachable when reading fails
+            with st.expander("⚠️ Danger Zone (Clear All)"):
+                if st.button("🔥 Clear ENTIRE Database"):
+                    store.clear()
+                    st.warning("All data has been wiped!")
+                    st.rerun()
+        
+        st.markdown("---")
+        render_admin_import()
+        
+        if store.keeps_history:
+            st.markdown("---")
+            render_admin_history()
+
+def render_admin_table(total):
+    """
+    Shows one page of the submissions matching the admin filters; only that
+    page is read from the store. Returns the name search text.
+    """
+    col1, col2 = st.columns(2)
+    name_prefix = col1.text_input("Search by name", key="admin_name_prefix", placeholder="Name starts with...")
+    on_date = col2.selectbox("Voted for", survey.selectable_iso, index=None, key="admin_on_date", placeholder="Any date")
+    if name_prefix.strip() or on_date:
+        total = store.count(name_prefix, on_date)
+    
+    col1, col2 = st.columns([0.3, 0.7])
+    page_size = col1.selectbox("Rows per page", ADMIN_PAGE_SIZES, index=1, key="admin_page_size")
+    pages = max(1, -(-total // page_size))
+    # Keep the page in range when rows were deleted or the filters changed
+    if st.session_state.get("admin_page", 1) > pages:
+        st.session_state.admin_page = pages
+    page = col2.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1, key="admin_page")
+    
+    if not total:
+        st.info("No submissions match the filters.")
+        return name_prefix
+    
+    offset = (page - 1) * page_size
+    rows = store.page(offset, page_size, name_prefix, on_date)
+    columns = {col: [] for col in CSV_COLUMNS}
+    for row in rows:
+        for col, value in zip(CSV_COLUMNS, row.csv_fields()):
+            columns[col].append(value)
+    
+    st.dataframe(columns, hide_index=True, use_container_width=True)
+    st.caption(f"Rows {offset + 1}–{offset + len(rows)} of {total}")
+    return name_prefix
+
+def render_admin_history():
+    """Every submit, edit and delete of one voter (stores that keep history only)."""
+    st.subheader("📜 History for This User")
+    name = st.text_input("Name", key="admin_history_name", placeholder="Case and extra spaces are ignored")
+    if not name.strip():
+        return
+    try:
+        events = store.history(name)
+    except StorageError as e:
+        st.error(f"Could not read the history: {e}")
+        return
+    if not events:
+        st.info(f"No history for {name}.")
+        return
+    st.dataframe(
+        {
+            "Time": [e["timestamp"] for e in events],
+            "Action": [e["op"] for e in events],
+            "Name": [e["name"] for e in events],
+            "Dates": [", ".join(e["dates"]) for e in events],
+        },
+        hide_index=True,
+        use_container_width=True,
+    )
+
+def render_admin_import():
+    """Bulk import of a CSV file in the download format."""
+    st.subheader("📤 Import CSV")
+    st.caption(
+        "Merges a CSV file in the download format into the survey. "
+        "For names that already voted, the submission with the newer timestamp is kept."
+    )
+    uploaded = st.file_uploader("CSV file", type="csv", key="admin_import_file")
+    if uploaded is not None and st.button("Import", key="admin_import"):
+        try:
+            report = store.import_csv(uploaded, allowed_dates=frozenset(survey.selectable_iso))
+        except StorageError as e:
+            st.error(f"Import failed: {e}")
+            return
+        st.success(f"Imported {report.imported} submission(s).")
+        if report.outdated:
+            st.info(f"Kept {report.outdated} newer submission(s) already in the survey.")
+        if report.invalid:
+            st.warning(
+                f"Skipped {report.invalid} invalid row(s):\n\n"
+                + "\n".join(f"- {e}" for e in report.errors)
+            )
 
 def handle_login():
     if st.session_state.temp_name:
@@ -301,8 +395,14 @@ def handle_submit():
         st.error("Please login first!")
         return
         
-    save_submission(st.session_state.user_name, st.session_state.selected_dates)
+    try:
+        save_submission(st.session_state.user_name, st.session_state.selection)
+    except StorageError as e:
+        st.error(f"Could not save your choices, please try again. ({e})")
+        return
     st.session_state.submitted = True
+    # Show the results including this vote right away, not after the debounce
+    st.session_state.pop('live_stats', None)
     st.balloons()
     st.rerun()
 
@@ -317,80 +417,92 @@ def handle_edit():
 if 'page' not in st.session_state:
     st.session_state.page = "home"
 
-if st.session_state.page == "admin":
-    render_admin()
-
-else:
-    # --- View Only Mode ---
+def current_page():
+    """Name of the page this rerun renders, as a metrics label."""
+    if st.session_state.page == "admin":
+        return "admin"
     if st.session_state.view_only:
-        st.title("📊 Voting Results")
-        render_statistics()
+        return "view_only"
+    if not st.session_state.user_name:
+        return "login"
+    return "results" if st.session_state.submitted else "calendar"
+
+with metrics.timed("rerun_seconds", page=current_page()):
+    if st.session_state.page == "admin":
+        render_admin()
+
+    else:
+        # --- View Only Mode ---
+        if st.session_state.view_only:
+            st.title("📊 Voting Results")
+            render_statistics()
         
-        st.markdown("---")
-        if st.button("🔙 Back to Login"):
-            st.session_state.view_only = False
-            st.rerun()
-
-    # --- Login Screen ---
-    elif not st.session_state.user_name:
-        st.title("🍽️ Dinner Survey")
-        st.markdown("### Please enter your name to start")
+            st.markdown("---")
+            if st.button("🔙 Back to Login"):
+                st.session_state.view_only = False
+                st.rerun()
+
+        # --- Login Screen ---
+        elif not st.session_state.user_name:
+            st.title("🍽️ Dinner Survey")
+            st.markdown("### Please enter your name to start")
         
-        st.text_input("Name", key="temp_name", on_change=handle_login)
+            st.text_input("Name", key="temp_name", on_change=handle_login)
         
-        col1, col2 = st.columns(2)
-        with col1:
-            if st.button("Start / Login", type="primary", use_container_width=True):
-                handle_login()
-        with col2:
-            if st.button("👀 Just View Results", use_container_width=True):
-                st.session_state.view_only = True
-                st.rerun()
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button("Start / Login", type="primary", use_container_width=True):
+                    handle_login()
+            with col2:
+                if st.button("👀 Just View Results", use_container_width=True):
+                    st.session_state.view_only = True
+                    st.session_state.pop('live_stats', None)
+                    st.rerun()
                 
-        st.markdown("<br>", unsafe_allow_html=True)
-        if st.button("🔒 Admin Panel", type="secondary"):
-            st.session_state.page = "admin"
-            st.rerun()
+            st.markdown("<br>", unsafe_allow_html=True)
+            if st.button("🔒 Admin Panel", type="secondary"):
+                st.session_state.page = "admin"
+                st.rerun()
 
-    # --- Main App (Logged In) ---
-    else:
-        # Header
-        col1, col2 = st.columns([0.8, 0.2])
-        col1.title(f"Hi, {st.session_state.user_name} 👋")
-        if col2.button("Logout"):
-            st.session_state.user_name = ""
-            st.session_state.selected_dates = []
-            st.session_state.submitted = False
-            st.rerun()
-
-        if not st.session_state.submitted:
-            st.markdown("### Select up to 3 dates for dinner in **January 2026**")
+        # --- Main App (Logged In) ---
+        else:
+            # Header
+            col1, col2 = st.columns([0.8, 0.2])
+            col1.title(f"Hi, {st.session_state.user_name} 👋")
+            if col2.button("Logout"):
+                st.session_state.user_name = ""
+                st.session_state.selection = Selection(survey)
+                st.session_state.submitted = False
+                st.rerun()
+
+            if not st.session_state.submitted:
+                st.markdown(f"### Select up to {survey.max_picks} dates for dinner in **{survey.label}**")
             
-            # Layout: Calendar on top, Selected Dates below
-            render_calendar()
+                # Layout: Calendar on top, Selected Dates below
+                render_calendar(survey)
             
-            # Spacer
-            st.markdown("<br>", unsafe_allow_html=True)
+                # Spacer
+                st.markdown("<br>", unsafe_allow_html=True)
 
-            # Submit Button
-            if st.button("🚀 Submit My Choices", type="primary", use_container_width=True):
-                handle_submit()
+                # Submit Button
+                if st.button("🚀 Submit My Choices", type="primary", use_container_width=True):
+                    handle_submit()
 
-        else:
-            # --- Result Page ---
-            st.success("🎉 Thanks! Your choices have been saved.")
+            else:
+                # --- Result Page ---
+                st.success("🎉 Thanks! Your choices have been saved.")
             
-            st.markdown("### You selected:")
-            for d in sorted(st.session_state.selected_dates):
-                st.markdown(f"- 🗓️ **{d.strftime('%Y-%m-%d')} ({d.strftime('%A')})**")
+                st.markdown("### You selected:")
+                for d in st.session_state.selection:
+                    st.markdown(f"- 🗓️ **{d.strftime('%Y-%m-%d')} ({d.strftime('%A')})**")
                 
-            st.markdown("---")
+                st.markdown("---")
             
-            # --- Public Statistics Section ---
-            render_statistics()
+                # --- Public Statistics Section ---
+                render_statistics()
                 
-            st.markdown("---")
-            st.info("Need to change your mind? You can edit your selection below.")
+                st.markdown("---")
+                st.info("Need to change your mind? You can edit your selection below.")
             
-            if st.button("✏️ Edit Selection"):
-                handle_edit()
+                if st.button("✏️ Edit Selection"):
+                    handle_edit()
@@ -0,0 +1,71 @@
+import os
+import re
+import threading
+from pathlib import Path
+
+import streamlit as st
+
+# ==========================================
+# Configuration
+# ==========================================
+# Served at app/static/ when server.enableStaticServing is on
+STATIC_DIR = Path(__file__).parent / "static"
+CSS_FILE = STATIC_DIR / "styles.css"
+
+# DINNER_SURVEY_DEV=1 picks up edits to the stylesheet without a restart
+DEV_MODE = os.environ.get("DINNER_SURVEY_DEV") == "1"
+
+
+# ==========================================
+# Minification
+# ==========================================
+_COMMENT_RE = re.compile(r"/\*.*?\*/", re.S)
+_SPACE_RE = re.compile(r"\s+")
+_PUNCT_RE = re.compile(r"\s*([{};,])\s*")
+_COLON_RE = re.compile(r":\s+")
+
+
+def minify_css(text):
+    """
+    Strips comments and redundant whitespace from a stylesheet.
+    Does not parse strings, so it is meant for our own CSS only.
+    """
+    text = _COMMENT_RE.sub("", text)
+    text = _SPACE_RE.sub(" ", text)
+    text = _PUNCT_RE.sub(r"\1", text)
+    text = _COLON_RE.sub(":", text)
+    return text.replace(";}", "}").strip()
+
+
+# ==========================================
+# Stylesheet
+# ==========================================
+_cache = {}     # path -> (mtime_ns, minified text)
+_cache_lock = threading.Lock()
+
+
+def _load(path):
+    """Returns (mtime_ns, minified text), read once per process, or again after a change in dev mode."""
+    cached = _cache.get(path)
+    if cached is not None and not DEV_MODE:
+        return cached
+    mtime = path.stat().st_mtime_ns
+    if cached is not None and cached[0] == mtime:
+        return cached
+    with _cache_lock:
+        with open(path, encoding="utf-8") as f:
+            cached = _cache[path] = (mtime, minify_css(f.read()))
+    return cached
+
+
+def inject_css(path=CSS_FILE):
+    """
+    Adds the stylesheet to the page. With server.enableStaticServing the
+    browser fetches (and caches) it from app/static/, so a rerun only sends
+    a one-line @import; otherwise the minified text is inlined.
+    """
+    mtime, css = _load(path)
+    if path.parent == STATIC_DIR and st.get_option("server.enableStaticServing"):
+        # The mtime in the URL makes browsers fetch an edited file
+        css = f'@import url("app/static/{path.name}?v={mtime}");'
+    st.markdown(f"<style>{css}</style>", unsafe_allow_html=True)
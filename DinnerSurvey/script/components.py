@@ -1,113 +1,106 @@
 import streamlit as st
-import calendar
-from datetime import date, timedelta
+from datetime import date
 
-# Configuration
-TARGET_YEAR = 2026
-TARGET_MONTH = 1
-HOLIDAYS = [
-    date(2026, 1, 1),  # New Year's Day
-    date(2026, 1, 2),  # Extended Holiday
-]
+import metrics
+from layout import WEEKDAY_HEADER, date_list_layout, month_layout
+from selection import Selection, SelectionFull
 
-def is_workday(d):
+def toggle_date(target_date, survey):
     """
-    Returns True if the date is a workday (Mon-Fri) and not a holiday.
+    Toggles a date in the session's Selection.
+    The Selection enforces the survey's maximum number of selected dates.
     """
-    # 0=Mon, 4=Fri, 5=Sat, 6=Sun
-    if d.weekday() >= 5:
-        return False
-    if d in HOLIDAYS:
-        return False
-    return True
-
-def toggle_date(target_date):
-    """
-    Toggles a date in the session state.
-    Enforces a maximum of 3 selected dates.
-    """
-    if 'selected_dates' not in st.session_state:
-        st.session_state.selected_dates = []
-    
     # Convert to date object if it's not already
     if isinstance(target_date, str):
         target_date = date.fromisoformat(target_date)
         
-    # Create a copy to ensure state mutation is detected
-    current_selection = list(st.session_state.selected_dates)
-    
-    if target_date in current_selection:
-        current_selection.remove(target_date)
-    else:
-        if len(current_selection) >= 3:
-            st.warning("最多只能選擇 3 個日期喔！ (You can only select up to 3 days)", icon="⚠️")
-        else:
-            current_selection.append(target_date)
-            
-    st.session_state.selected_dates = current_selection
+    try:
+        # A new Selection object, so the state change is detected
+        st.session_state.selection = current_selection(survey).toggle(target_date)
+    except SelectionFull:
+        # Toast rather than st.warning: this runs as a widget callback
+        st.toast(f"最多只能選擇 {survey.max_picks} 個日期喔！ (You can only select up to {survey.max_picks} days)", icon="⚠️")
 
-def render_calendar(year=TARGET_YEAR, month=TARGET_MONTH):
+def current_selection(survey):
+    """Returns the session's Selection, an empty one if there is none yet."""
+    selection = st.session_state.get('selection')
+    if selection is None or selection.survey is not survey:
+        selection = st.session_state.selection = Selection(survey)
+    return selection
+
+@st.fragment
+@metrics.timed("fragment_seconds", fragment="calendar")
+def render_calendar(survey):
+    """
+    Renders a custom calendar grid for every month of the survey.
+    Only the survey's selectable days are clickable.
+
+    Runs as a fragment: a click toggles the date in its on_click callback
+    and reruns only the grid, not the whole app.
     """
-    Renders a custom calendar grid for Jan 2026.
-    Locked to this specific month.
+    for year, month in survey.months:
+        render_month(survey, year, month)
+
+def render_month(survey, year, month):
+    """
+    Renders the calendar grid of a single month.
+    Grid, labels, keys and selectable flags come from the shared
+    MonthLayout; only the selected state is per session.
     """
+    layout = month_layout(year, month, survey.selectable)
+    
     # Header for the calendar
-    month_name = calendar.month_name[month]
-    st.markdown(f"### 🗓️ {month_name} {year}")
+    st.markdown(layout.title)
     
     # Days of week header
     cols = st.columns(7)
-    days = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
-    for i, day in enumerate(days):
-        cols[i].markdown(f"**{day}**", unsafe_allow_html=True)
+    for i, day in enumerate(WEEKDAY_HEADER):
+        cols[i].markdown(day, unsafe_allow_html=True)
         
     # Calendar grid
-    cal = calendar.monthcalendar(year, month)
+    selection = current_selection(survey)
     
-    for week in cal:
+    for week in layout.weeks:
         cols = st.columns(7)
-        for i, day in enumerate(week):
-            if day == 0:
+        for i, cell in enumerate(week):
+            if cell is None:
                 cols[i].write("") # Empty slot
+                continue
+            current_date, label, key, selectable = cell
+            
+            # Button styling logic
+            if not selectable:
+                # Disabled look
+                cols[i].button(label, key=key, disabled=True)
             else:
-                current_date = date(year, month, day)
-                is_selected = current_date in st.session_state.get('selected_dates', [])
-                
-                # Check if date is selectable
-                selectable = is_workday(current_date)
+                # Determine button type (primary = selected)
+                btn_type = "primary" if current_date in selection else "secondary"
                 
-                # Button styling logic
-                if not selectable:
-                    # Disabled look
-                    label = f"{day}"
-                    cols[i].button(label, key=f"cal_btn_dis_{day}", disabled=True)
-                else:
-                    # Determine button type (primary = selected)
-                    btn_type = "primary" if is_selected else "secondary"
-                    key = f"cal_btn_{year}_{month}_{day}"
-                    
-                    if cols[i].button(f"{day}", key=key, type=btn_type, use_container_width=True):
-                        toggle_date(current_date)
-                        st.rerun()
+                cols[i].button(
+                    label, key=key, type=btn_type, use_container_width=True,
+                    on_click=toggle_date, args=(current_date, survey)
+                )
 
-def render_date_list():
+@st.fragment
+@metrics.timed("fragment_seconds", fragment="date_list")
+def render_date_list(survey):
     """
-    Renders a list view of available dates in Jan 2026.
+    Renders a list view of the survey's available dates.
     Uses full-width buttons for better clickability.
+
+    Runs as a fragment, like render_calendar.
     """
-    st.markdown("### 📋 Available Dates (Jan 2026)")
+    st.markdown(f"### 📋 Available Dates ({survey.label})")
     
-    # Generate all days in Jan 2026
-    num_days = calendar.monthrange(TARGET_YEAR, TARGET_MONTH)[1]
-    all_days = [date(TARGET_YEAR, TARGET_MONTH, day) for day in range(1, num_days + 1)]
+    # Workdays only, with keys and labels precomputed once per process
+    layout = date_list_layout(survey.selectable_days)
     
-    # Filter for workdays only
-    available_days = [d for d in all_days if is_workday(d)]
+    selection = current_selection(survey)
     
     # Create a container for the list
     with st.container():
-        for d in available_days:
-            is_selected = d in st.session_state.get('selected_dates', [])
+        for d, chk_key, btn_key, label_text in layout.rows:
+            is_selected = d in selection
             
             # Use columns to separate Checkbox and Text
             # col1: Checkbox (Small width)
@@ -115,47 +108,26 @@ def render_date_list():
             col1, col2 = st.columns([0.1, 0.9])
             
             # --- Column 1: Checkbox ---
-            def on_chk_change(d=d):
-                toggle_date(d)
-                
             col1.checkbox(
                 "Select", 
                 value=is_selected, 
-                key=f"list_chk_{d}", 
+                key=chk_key, 
                 label_visibility="collapsed",
-                on_change=on_chk_change
+                on_change=toggle_date, args=(d, survey)
             )
             
             # --- Column 2: Clickable Text Button ---
             # Button styling logic
             btn_type = "primary" if is_selected else "secondary"
-            key = f"list_btn_{d}"
-            
-            # Display date details
-            day_name = d.strftime("%A")
-            date_str = d.strftime("%Y-%m-%d")
             
             # Wrap in custom class for left alignment
             col2.markdown('<div class="row-btn">', unsafe_allow_html=True)
             
-            # Simplified Format: "06 | Monday" (Removed 2026-01)
-            # Larger Font: wrapped in span with font-size
-            day_num = d.strftime("%d")
-            day_name = d.strftime("%A")
-            label_html = f'<span style="font-size: 1.2rem; font-weight: 600;">{day_num}</span> <span style="color: #64748b; margin-left: 10px;">| {day_name}</span>'
-            
-            # Since st.button doesn't support HTML, we have to use the label as plain text
-            # OR we can use the previous trick of putting the button inside a container 
-            # but the button text itself is limited.
-            
-            # Wait, the user wants larger font. st.button text size is hard to change without global CSS.
-            # But we can change the label text to be simpler: "06  |  Monday"
-            # And use CSS to target the button text size.
-            
-            label_text = f"{day_num}  |  {day_name}"
-                
-            if col2.button(label_text, key=key, type=btn_type, use_container_width=True):
-                toggle_date(d)
-                st.rerun()
+            # Simplified Format: "06  |  Monday"; st.button does not render
+            # HTML, so the larger font comes from the global CSS
+            col2.button(
+                label_text, key=btn_key, type=btn_type, use_container_width=True,
+                on_click=toggle_date, args=(d, survey)
+            )
                 
             col2.markdown('</div>', unsafe_allow_html=True)
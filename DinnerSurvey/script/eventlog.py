@@ -0,0 +1,362 @@
+import itertools
+import json
+import os
+import tempfile
+import threading
+from collections import deque
+from pathlib import Path
+
+import metrics
+from storage import (
+    CHANGELOG_ROWS, FileLock, Submission, SubmissionStore,
+    filter_index, format_timestamp, normalize_name, search_sorted_keys,
+)
+
+# ==========================================
+# Configuration
+# ==========================================
+LOG_FILE = "events.jsonl"
+SNAPSHOT_FILE = "snapshot.json"
+
+# Events between snapshots; startup replays at most this many log lines
+SNAPSHOT_EVERY = int(os.environ.get("DINNER_SURVEY_SNAPSHOT_EVERY", "10000"))
+
+
+def _encode(event):
+    return (json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+# ==========================================
+# Event Log Backend
+# ==========================================
+class EventLogStore(SubmissionStore):
+    """
+    Append-only event log store. Every submit, edit, delete and clear is
+    one JSON line appended to events.jsonl, and the current submissions
+    are materialized in memory by replaying it. A write costs one small
+    append instead of a rewrite, and the log is the edit history of every
+    voter (see history).
+
+    Every `snapshot_every` events the materialized state is written to
+    snapshot.json with the log offset it covers, so startup loads the
+    snapshot and replays only the tail. The log itself is never rewritten.
+
+    Appends are serialized across processes with a lock file. Each process
+    catches up with the appends of others before reads and writes by
+    reading the log from the last offset it applied, and remembers the
+    row changes of the last CHANGELOG_ROWS events it applied for
+    changes_since.
+    """
+
+    keeps_history = True
+
+    def __init__(self, data_dir, legacy_csv=None, snapshot_every=SNAPSHOT_EVERY):
+        super().__init__()
+        self.dir = Path(data_dir)
+        self.log_path = self.dir / LOG_FILE
+        self.snapshot_path = self.dir / SNAPSHOT_FILE
+        self.lock = FileLock(self.dir / (LOG_FILE + ".lock"))
+        self.snapshot_every = snapshot_every
+        self._defer_compaction = False
+        self._mem_lock = threading.RLock()
+        self._reset(None)
+        # (version, sorted normalized names) for prefix searches, built on demand
+        self._sorted_keys = (None, [])
+
+        self.dir.mkdir(parents=True, exist_ok=True)
+        with self.lock:
+            created = not self.log_path.exists()
+            if created:
+                self.log_path.touch()
+        # One-off migration of the old CSV file into a brand new log
+        if created and legacy_csv is not None and Path(legacy_csv).exists():
+            report = self.import_csv(legacy_csv)
+            if report.invalid:
+                print(f"Skipped {report.invalid} invalid row(s) of {legacy_csv}: {'; '.join(report.errors)}")
+
+    # --- Materialized view ---
+    def _reset(self, inode):
+        self._rows = {}         # normalized name -> Submission, in submission order
+        self._inode = inode     # inode of the log the view was built from
+        self._offset = 0        # bytes of the log applied to _rows
+        self._since_snapshot = 0
+        # (offset before, offset after, (old row, new row) or None for a clear) per applied event
+        self._recent = deque(maxlen=CHANGELOG_ROWS)
+
+    def _version(self):
+        return None if self._inode is None else (self._inode, self._offset)
+
+    def _sync(self):
+        """Applies what was appended to the log since the last sync, by any process. Returns the version."""
+        try:
+            st = os.stat(self.log_path)
+        except FileNotFoundError:
+            st = None
+        with self._mem_lock:
+            if st is None:
+                self._reset(None)
+            else:
+                if st.st_ino != self._inode:
+                    self._load_snapshot(st)
+                if st.st_size > self._offset:
+                    self._replay()
+            return self._version()
+
+    def _load_snapshot(self, st):
+        """Starts over from the snapshot of the current log, or from nothing."""
+        self._reset(st.st_ino)
+        try:
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return
+        except (ValueError, OSError) as e:
+            print(f"Ignoring unreadable snapshot {self.snapshot_path}: {e}")
+            return
+        if snapshot.get("log_inode") != st.st_ino or snapshot["offset"] > st.st_size:
+            # Snapshot of another (replaced) log
+            return
+        for name, dates, timestamp in snapshot["rows"]:
+            self._rows[normalize_name(name)] = Submission(name, tuple(dates), timestamp)
+        self._offset = snapshot["offset"]
+        metrics.inc("storage_bytes_read_total", self.snapshot_path.stat().st_size, backend="eventlog")
+
+    def _replay(self):
+        with open(self.log_path, "rb") as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # An append in progress (or torn, see _append); picked up by the next sync
+                    break
+                try:
+                    event = json.loads(line)
+                    change = self._apply(event)
+                except (ValueError, KeyError, TypeError, AttributeError) as e:
+                    # One bad line must not make the whole store unreadable
+                    print(f"Skipping unreadable event in {self.log_path} at byte {self._offset}: {e!r}")
+                    metrics.inc("storage_bad_events_total", backend="eventlog")
+                    # Not an event: changes_since has to rebuild across it
+                    event, change = {"op": "clear"}, None
+                self._recent.append((self._offset, self._offset + len(line),
+                                     None if event["op"] == "clear" else change))
+                self._offset += len(line)
+                self._since_snapshot += 1
+                metrics.inc("storage_bytes_read_total", len(line), backend="eventlog")
+
+    def _apply(self, event):
+        """
+        Folds one event into the view. Returns (old row, new row). A
+        malformed event raises before the view changes.
+        """
+        op = event["op"]
+        if op == "clear":
+            self._rows = {}
+            return None, None
+        if op not in ("submit", "edit", "delete"):
+            raise ValueError(f"unknown op {op!r}")
+        key = normalize_name(event["name"])
+        new = None
+        if op != "delete":
+            new = Submission(event["name"], tuple(event["dates"]), event["timestamp"])
+        old = self._rows.pop(key, None)
+        if new is not None:
+            # Re-inserted, so an edit moves the voter to the end like a resubmission
+            self._rows[key] = new
+        return old, new
+
+    # --- Appending ---
+    def _append(self, events):
+        """Appends encoded events to the log (caller holds self.lock) and applies them."""
+        data = b"".join(_encode(e) for e in events)
+        with metrics.timed("storage_write_seconds", backend="eventlog"):
+            with open(self.log_path, "a+b") as f:
+                self._drop_torn_tail(f)
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+        metrics.inc("storage_bytes_written_total", len(data), backend="eventlog")
+        after = self._sync()
+        if self._since_snapshot >= self.snapshot_every and not self._defer_compaction:
+            self.compact()
+        return after
+
+    def _drop_torn_tail(self, f):
+        """
+        Truncates the log back to its last complete line. Under self.lock no
+        append is in progress, so a line without its newline is the remains
+        of a write that failed (a crash, a full disk) and would otherwise
+        swallow the next event.
+        """
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        end = size
+        while end > 0:
+            start = max(0, end - 65536)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                end = start + newline + 1
+                break
+            end = start
+        print(f"Dropping {size - end} byte(s) of an incomplete event at the end of {self.log_path}")
+        f.truncate(end)
+
+    def compact(self):
+        """Writes a snapshot of the view, so startup does not replay the log before it."""
+        with self._mem_lock:
+            rows = [[row.name, list(row.dates), row.timestamp] for row in self._rows.values()]
+            snapshot = {"log_inode": self._inode, "offset": self._offset, "rows": rows}
+            self._since_snapshot = 0
+        fd, tmp = tempfile.mkstemp(dir=self.dir, prefix=f".{SNAPSHOT_FILE}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                # dumps() uses the C encoder; dump() to a file does not
+                f.write(json.dumps(snapshot, ensure_ascii=False, separators=(",", ":")))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.snapshot_path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except FileNotFoundError:
+                pass
+            raise
+
+    # --- Store interface ---
+    def import_csv(self, source, allowed_dates=None, batch_size=None):
+        # One snapshot at the end rather than one per snapshot_every rows
+        self._defer_compaction = True
+        try:
+            return super().import_csv(source, allowed_dates, batch_size)
+        finally:
+            self._defer_compaction = False
+            if self._since_snapshot >= self.snapshot_every:
+                self.compact()
+
+    def get(self, name):
+        self._sync()
+        return self._rows.get(normalize_name(name))
+
+    def upsert(self, name, dates, timestamp=None):
+        row = Submission.create(name, dates, timestamp)
+        self.upsert_many([row])
+        return row
+
+    def upsert_many(self, rows, keep_newer=False):
+        with self.lock:
+            before = self._sync()
+            batch = {}
+            events, changes = [], []
+            for row in rows:
+                key = normalize_name(row.name)
+                old = batch.get(key, self._rows.get(key))
+                if keep_newer and old is not None and old.timestamp > row.timestamp:
+                    continue
+                events.append({
+                    "op": "submit" if old is None else "edit",
+                    "name": row.name, "dates": list(row.dates), "timestamp": row.timestamp,
+                })
+                changes.append((old, row))
+                batch[key] = row
+            if not events:
+                return 0
+            after = self._append(events)
+        self._publish(before, after, changes)
+        return len(changes)
+
+    def delete(self, names):
+        with self.lock:
+            before = self._sync()
+            now = format_timestamp()
+            changes = {}
+            for name in names:
+                key = normalize_name(name)
+                if key in self._rows and key not in changes:
+                    changes[key] = (self._rows[key], None)
+            if not changes:
+                return 0
+            after = self._append([
+                {"op": "delete", "name": old.name, "timestamp": now} for old, _ in changes.values()
+            ])
+        self._publish(before, after, list(changes.values()))
+        return len(changes)
+
+    def clear(self):
+        with self.lock:
+            before = self._sync()
+            after = self._append([{"op": "clear", "timestamp": format_timestamp()}])
+        self._publish(before, after, None)
+
+    def changes_since(self, version):
+        with self._mem_lock:
+            current = self._sync()
+            if version is None or current is None or version[0] != current[0] or version[1] > current[1]:
+                return None
+            if version == current:
+                return current, []
+            changes = []
+            found = False
+            for start, _, change in self._recent:
+                if not found:
+                    if start < version[1]:
+                        continue
+                    if start > version[1]:
+                        # Events after `version` were dropped from the buffer (or came from a snapshot)
+                        return None
+                    found = True
+                if change is None:
+                    return None
+                changes.append(change)
+            return (current, changes) if found else None
+
+    def history(self, name):
+        # Scans the whole log: an admin action, not a hot path
+        key = normalize_name(name)
+        events = []
+        with open(self.log_path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    event = json.loads(line)
+                    if event["op"] == "clear" or normalize_name(event["name"]) == key:
+                        events.append({"op": event["op"], "name": event.get("name", ""),
+                                       "dates": event.get("dates", []), "timestamp": event["timestamp"]})
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    # Reported by _replay
+                    continue
+        return events
+
+    def iter_all(self):
+        return iter(self.read_all()[1])
+
+    def read_all(self):
+        with self._mem_lock:
+            return self._sync(), list(self._rows.values())
+
+    def count(self, name_prefix="", on_date=None):
+        if not name_prefix and not on_date:
+            self._sync()
+            return len(self._rows)
+        with self._mem_lock:
+            self._sync()
+            return sum(1 for _ in filter_index(self._rows, name_prefix, on_date))
+
+    def page(self, offset, limit, name_prefix="", on_date=None):
+        with self._mem_lock:
+            self._sync()
+            return list(itertools.islice(filter_index(self._rows, name_prefix, on_date), offset, offset + limit))
+
+    def search_names(self, name_prefix, limit):
+        with self._mem_lock:
+            version = self._sync()
+            if self._sorted_keys[0] != version or version is None:
+                self._sorted_keys = (version, sorted(self._rows))
+            return search_sorted_keys(self._sorted_keys[1], self._rows, name_prefix, limit)
+
+    def version(self):
+        return self._sync()
@@ -0,0 +1,78 @@
+import calendar
+import threading
+from datetime import date
+
+# ==========================================
+# Calendar Layout
+# ==========================================
+WEEKDAY_HEADER = ("**Mon**", "**Tue**", "**Wed**", "**Thu**", "**Fri**", "**Sat**", "**Sun**")
+
+
+class MonthLayout:
+    """
+    Everything render_month draws for one month that does not depend on
+    the session: the title, and per week seven cells that are either None
+    (outside the month) or (date, label, widget key, selectable).
+    Built once per process and shared read-only by every session.
+    """
+
+    def __init__(self, year, month, selectable):
+        self.year = year
+        self.month = month
+        self.title = f"### 🗓️ {calendar.month_name[month]} {year}"
+        self.weeks = tuple(
+            tuple(self._cell(year, month, day, selectable) if day else None for day in week)
+            for week in calendar.monthcalendar(year, month)
+        )
+
+    @staticmethod
+    def _cell(year, month, day, selectable):
+        d = date(year, month, day)
+        if d in selectable:
+            return d, f"{day}", f"cal_btn_{year}_{month}_{day}", True
+        return d, f"{day}", f"cal_btn_dis_{year}_{month}_{day}", False
+
+
+class DateListLayout:
+    """
+    The rows of render_date_list for a tuple of days: per day
+    (date, checkbox key, button key, button label). Shared read-only.
+    """
+
+    def __init__(self, days):
+        self.rows = tuple(
+            (d, f"list_chk_{d}", f"list_btn_{d}", f"{d:%d}  |  {d:%A}") for d in days
+        )
+
+
+# ==========================================
+# Memoization
+# ==========================================
+# Survey.selectable covers the date range, weekdays and holidays, and
+# caches its hash, so the lookup costs one dict access per month.
+_months = {}        # (year, month, selectable days) -> MonthLayout
+_date_lists = {}    # tuple of days -> DateListLayout
+_lock = threading.Lock()
+
+
+def month_layout(year, month, selectable):
+    """Returns the shared MonthLayout of a month, given the survey's selectable days."""
+    key = (year, month, selectable)
+    layout = _months.get(key)
+    if layout is None:
+        with _lock:
+            layout = _months.get(key)
+            if layout is None:
+                layout = _months[key] = MonthLayout(year, month, selectable)
+    return layout
+
+
+def date_list_layout(days):
+    """Returns the shared DateListLayout of a tuple of days."""
+    layout = _date_lists.get(days)
+    if layout is None:
+        with _lock:
+            layout = _date_lists.get(days)
+            if layout is None:
+                layout = _date_lists[days] = DateListLayout(days)
+    return layout
@@ -0,0 +1,234 @@
+import atexit
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ==========================================
+# Configuration
+# ==========================================
+# Instrumentation is off unless an exporter is configured:
+#   DINNER_SURVEY_METRICS_PORT=9464          Prometheus text on http://127.0.0.1:9464/metrics
+#   DINNER_SURVEY_METRICS_LOG=metrics.jsonl  one JSON snapshot appended per interval
+METRICS_PORT = os.environ.get("DINNER_SURVEY_METRICS_PORT")
+METRICS_LOG = os.environ.get("DINNER_SURVEY_METRICS_LOG")
+METRICS_INTERVAL = float(os.environ.get("DINNER_SURVEY_METRICS_INTERVAL", "60"))
+ENABLED = bool(METRICS_PORT or METRICS_LOG)
+
+PREFIX = "dinner_survey_"
+
+# Upper bounds (seconds) of the timing histogram buckets
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+# ==========================================
+# Registry
+# ==========================================
+class Registry:
+    """
+    Process-wide counters and timing histograms, keyed by metric name and
+    a sorted tuple of label pairs. One lock guards all updates; an update
+    is a couple of dict operations, cheap enough to leave on.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}      # (name, labels) -> value
+        self.timings = {}       # (name, labels) -> [count, sum, max, bucket counts...]
+
+    def inc(self, name, value=1, labels=()):
+        key = (name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, labels=()):
+        key = (name, labels)
+        i = bisect.bisect_left(BUCKETS, seconds)
+        with self.lock:
+            t = self.timings.get(key)
+            if t is None:
+                t = self.timings[key] = [0, 0.0, 0.0] + [0] * len(BUCKETS)
+            t[0] += 1
+            t[1] += seconds
+            t[2] = max(t[2], seconds)
+            if i < len(BUCKETS):
+                t[3 + i] += 1
+
+    def snapshot(self):
+        """Returns the current values as a JSON-serializable dict."""
+        with self.lock:
+            counters = dict(self.counters)
+            timings = {key: list(t) for key, t in self.timings.items()}
+        return {
+            "time": time.time(),
+            "pid": os.getpid(),
+            "counters": {_series(name, labels): value for (name, labels), value in sorted(counters.items())},
+            "timings": {
+                _series(name, labels): {"count": t[0], "sum": round(t[1], 6), "max": round(t[2], 6)}
+                for (name, labels), t in sorted(timings.items())
+            },
+        }
+
+    def prometheus(self):
+        """Returns the current values in the Prometheus text exposition format."""
+        with self.lock:
+            counters = sorted(self.counters.items())
+            timings = sorted((key, list(t)) for key, t in self.timings.items())
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {PREFIX}{name} counter")
+                typed.add(name)
+            lines.append(f"{PREFIX}{_series(name, labels)} {value}")
+        for (name, labels), t in timings:
+            if name not in typed:
+                lines.append(f"# TYPE {PREFIX}{name} histogram")
+                typed.add(name)
+            cumulative = 0
+            for bound, n in zip(BUCKETS, t[3:]):
+                cumulative += n
+                lines.append(f"{PREFIX}{_series(name + '_bucket', labels + (('le', str(bound)),))} {cumulative}")
+            lines.append(f"{PREFIX}{_series(name + '_bucket', labels + (('le', '+Inf'),))} {t[0]}")
+            lines.append(f"{PREFIX}{_series(name + '_count', labels)} {t[0]}")
+            lines.append(f"{PREFIX}{_series(name + '_sum', labels)} {t[1]:.6f}")
+        return "\n".join(lines) + "\n"
+
+
+def _series(name, labels):
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+registry = Registry()
+
+
+# ==========================================
+# Recording
+# ==========================================
+def inc(name, value=1, **labels):
+    """Adds `value` to a counter."""
+    if ENABLED:
+        registry.inc(name, value, tuple(sorted(labels.items())))
+
+
+def cache_lookup(cache, hit):
+    """Counts a hit or miss of one of the process caches."""
+    if ENABLED:
+        registry.inc("cache_requests_total", 1, (("cache", cache), ("result", "hit" if hit else "miss")))
+
+
+class timed:
+    """
+    Records the wall time of a block, or of every call when used as a
+    decorator, in the histogram `name`:
+
+        with metrics.timed("rerun_seconds", page="admin"): ...
+
+        @metrics.timed("function_seconds", function="save_submission")
+        def save_submission(...): ...
+
+    Exceptions (including Streamlit's rerun/stop) are timed too. When
+    metrics are disabled the decorator returns the function unchanged.
+    Use a new instance per `with` block.
+    """
+
+    def __init__(self, name, **labels):
+        self.name = name
+        self.labels = tuple(sorted(labels.items()))
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if ENABLED:
+            registry.observe(self.name, time.perf_counter() - self._start, self.labels)
+
+    def __call__(self, fn):
+        if not ENABLED:
+            return fn
+        name, labels = self.name, self.labels
+
+        # Streamlit derives a fragment's id from __module__ and __qualname__
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                registry.observe(name, time.perf_counter() - start, labels)
+
+        return wrapper
+
+
+# ==========================================
+# Exporters
+# ==========================================
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = registry.prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve_prometheus(port, host="127.0.0.1"):
+    """Serves /metrics in Prometheus text format from a daemon thread. Returns the server."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def write_log(path):
+    """Appends one JSON snapshot line to `path`."""
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(registry.snapshot()) + "\n")
+
+
+def _flush_loop(path, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            write_log(path)
+        except OSError as e:
+            print(f"Could not write metrics to {path}: {e}")
+
+
+_started = False
+_start_lock = threading.Lock()
+
+
+def start_exporters():
+    """Starts the configured exporters once per process; a no-op when metrics are disabled."""
+    global _started
+    if not ENABLED or _started:
+        return
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+        if METRICS_PORT:
+            try:
+                serve_prometheus(int(METRICS_PORT))
+            except OSError as e:
+                print(f"Could not serve metrics on port {METRICS_PORT}: {e}")
+        if METRICS_LOG:
+            threading.Thread(
+                target=_flush_loop, args=(METRICS_LOG, METRICS_INTERVAL), name="metrics-log", daemon=True
+            ).start()
+            atexit.register(write_log, METRICS_LOG)
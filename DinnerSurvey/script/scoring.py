@@ -0,0 +1,196 @@
+import itertools
+from collections import Counter
+from math import comb
+
+import numpy as np
+
+# ==========================================
+# Configuration
+# ==========================================
+# best_cover tries every k-date combination up to this many, greedy beyond
+EXHAUSTIVE_LIMIT = 20_000
+
+# Elements of the (combinations x masks x words) block best_cover evaluates at once
+BLOCK_ELEMENTS = 1 << 21
+
+_WORD = 64
+_WORD_MASK = (1 << _WORD) - 1
+
+
+# ==========================================
+# Bitmasks
+# ==========================================
+if hasattr(np, "bitwise_count"):  # NumPy >= 2.0
+    def popcount(a):
+        """Number of set bits of every element of an unsigned integer array."""
+        return np.bitwise_count(a)
+else:
+    _POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def popcount(a):
+        """Number of set bits of every element of an unsigned integer array."""
+        a = np.ascontiguousarray(a)
+        return _POPCOUNT8[a.view(np.uint8)].reshape(*a.shape, a.itemsize).sum(axis=-1, dtype=np.uint8)
+
+
+def day_bits(days):
+    """Maps each ISO date of `days` to its bit number."""
+    return {d: i for i, d in enumerate(days)}
+
+
+def bitmask(dates, bits):
+    """Returns the picks `dates` as an int bitmask; dates missing from `bits` are ignored."""
+    mask = 0
+    for d in dates:
+        bit = bits.get(d)
+        if bit is not None:
+            mask |= 1 << bit
+    return mask
+
+
+def _to_words(masks, words):
+    """Packs int bitmasks into an (n, words) uint64 array, lowest bits in word 0."""
+    arr = np.empty((len(masks), words), dtype=np.uint64)
+    for w in range(words):
+        arr[:, w] = [(m >> (_WORD * w)) & _WORD_MASK for m in masks]
+    return arr
+
+
+# ==========================================
+# Vote Matrix
+# ==========================================
+class VoteMatrix:
+    """
+    The picks of all respondents as bitmasks over a survey's selectable
+    days: bit i is set if the respondent can attend days[i]. Identical
+    masks are stored once with a weight (the number of respondents), so
+    its size is the number of distinct pick combinations, a few thousand
+    at most for 3 picks, however many people voted.
+    """
+
+    def __init__(self, days, mask_counts):
+        self.days = tuple(days)
+        self.words = max(1, -(-len(self.days) // _WORD))
+        masks = list(mask_counts)
+        self.masks = _to_words(masks, self.words)                       # (m, words) uint64
+        self.weights = np.fromiter(mask_counts.values(), dtype=np.int64, count=len(masks))
+        self.respondents = int(self.weights.sum())
+        # Respondents who picked at least one of the days
+        self.voters = int(self.weights[popcount(self.masks).sum(axis=1) > 0].sum())
+        self._bits = None
+
+    @classmethod
+    def from_rows(cls, days, rows):
+        """Builds the matrix from Submission records."""
+        bits = day_bits(days)
+        return cls(days, Counter(bitmask(row.dates, bits) for row in rows))
+
+    @classmethod
+    def from_combos(cls, days, combos):
+        """Builds the matrix from {tuple of ISO dates: respondents} (see Tally.combos)."""
+        bits = day_bits(days)
+        mask_counts = Counter()
+        for dates, n in combos.items():
+            mask_counts[bitmask(dates, bits)] += n
+        return cls(days, mask_counts)
+
+    def bits(self):
+        """Returns the (m, days) 0/1 matrix of the masks."""
+        if self._bits is None:
+            raw = self.masks.astype("<u8").view(np.uint8)
+            self._bits = np.unpackbits(raw, axis=1, bitorder="little")[:, :len(self.days)].astype(np.int64)
+        return self._bits
+
+    # --- Scores ---
+    def counts(self):
+        """Respondents per day, in the order of `days`."""
+        return self.weights @ self.bits()
+
+    def best_date(self):
+        """Returns (ISO date, respondents) of the most picked day, the earliest on ties."""
+        if not self.days:
+            return None, 0
+        counts = self.counts()
+        i = int(counts.argmax())
+        return self.days[i], int(counts[i])
+
+    def overlap(self):
+        """
+        Returns the (days, days) matrix of respondents who picked both days;
+        the diagonal holds the per-day counts.
+        """
+        bits = self.bits()
+        return (bits * self.weights[:, None]).T @ bits
+
+    def cover(self, dates):
+        """Respondents who can attend at least one of the ISO `dates`."""
+        bits = day_bits(self.days)
+        combo = _to_words([bitmask(dates, bits)], self.words)
+        return int(self.weights[popcount(self.masks & combo).sum(axis=1) > 0].sum())
+
+    def best_cover(self, k):
+        """
+        Returns (ISO dates, respondents) of the `k` days that together let
+        the most respondents attend at least one of them. Ties go to the
+        combination whose respondents can attend the most of its days,
+        then to the earliest. Pairs come straight from the overlap matrix;
+        larger k is exhaustive up to EXHAUSTIVE_LIMIT candidate combinations
+        and greedy (a close approximation) beyond.
+        """
+        k = min(k, len(self.days))
+        if k <= 0:
+            return (), 0
+        if k == 2:
+            chosen = self._best_pair()
+        elif comb(len(self.days), k) > EXHAUSTIVE_LIMIT:
+            chosen = self._greedy_cover(k)
+        else:
+            chosen = self._exhaustive_cover(k)
+        dates = tuple(self.days[i] for i in sorted(chosen))
+        return dates, self.cover(dates)
+
+    def _best_pair(self):
+        # Inclusion-exclusion over the overlap matrix: |i or j| = |i| + |j| - |i and j|
+        overlap = self.overlap()
+        counts = np.diag(overlap)
+        attendances = counts[:, None] + counts[None, :]
+        score = (attendances - overlap) * (2 * self.respondents + 1) + attendances
+        # Only pairs of distinct days, each once (i < j)
+        score[np.tril_indices(len(self.days))] = -1
+        i, j = np.unravel_index(int(score.argmax()), score.shape)
+        return int(i), int(j)
+
+    def _exhaustive_cover(self, k):
+        combos = itertools.combinations(range(len(self.days)), k)
+        block = max(1, BLOCK_ELEMENTS // max(1, len(self.masks) * self.words))
+        weights = self.weights.astype(np.float64)
+        best_score, best = None, None
+        while True:
+            chunk = list(itertools.islice(combos, block))
+            if not chunk:
+                return best
+            combo_masks = _to_words([sum(1 << i for i in c) for c in chunk], self.words)
+            # attend[c, m]: how many days of combination c respondents of mask m can attend
+            attend = popcount(combo_masks[:, None, :] & self.masks[None, :, :])
+            attend = attend[:, :, 0] if self.words == 1 else attend.sum(axis=2, dtype=np.int64)
+            # BLAS float products; exact for any realistic number of respondents
+            covered = ((attend > 0) @ weights).astype(np.int64)
+            attendances = (attend @ weights).astype(np.int64)
+            # Lexicographic (covered, attendances) in one key; attendances <= k * respondents
+            score = covered * (k * self.respondents + 1) + attendances
+            i = int(score.argmax())
+            if best_score is None or score[i] > best_score:
+                best_score, best = score[i], chunk[i]
+
+    def _greedy_cover(self, k):
+        bits = self.bits()
+        uncovered = np.ones(len(self.masks), dtype=bool)
+        chosen = []
+        for _ in range(k):
+            gain = self.weights[uncovered] @ bits[uncovered] if uncovered.any() else np.zeros(len(self.days))
+            gain = gain * (k * self.respondents + 1) + self.counts()
+            gain[chosen] = -1
+            j = int(gain.argmax())
+            chosen.append(j)
+            uncovered &= bits[:, j] == 0
+        return chosen
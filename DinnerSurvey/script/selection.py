@@ -0,0 +1,96 @@
+from datetime import date
+
+# ==========================================
+# Selection
+# ==========================================
+class SelectionFull(ValueError):
+    """Raised when adding a day to a selection that already has the survey's max_picks."""
+
+
+class Selection:
+    """
+    The days one voter picked in a survey, as a bitmask over the survey's
+    selectable days: bit i is survey.selectable_days[i], the numbering
+    scoring.VoteMatrix uses too. One small int per session instead of a
+    list of date objects, with O(1) membership for the calendar cells.
+
+    Immutable: toggle() returns a new Selection, so assigning it to
+    st.session_state is the only way to change a session's picks.
+    Dates become ISO strings only at the storage boundary (from_iso/to_iso).
+    """
+
+    __slots__ = ("survey", "mask")
+
+    def __init__(self, survey, mask=0):
+        self.survey = survey
+        self.mask = mask
+
+    @classmethod
+    def from_iso(cls, survey, dates):
+        """
+        Builds a selection from stored ISO dates. Dates that are not
+        selectable in the survey, and picks beyond max_picks, are dropped.
+        """
+        mask = 0
+        picks = 0
+        for d in dates:
+            try:
+                bit = survey.day_bits.get(date.fromisoformat(d))
+            except (TypeError, ValueError):
+                continue
+            if bit is None or mask >> bit & 1 or picks >= survey.max_picks:
+                continue
+            mask |= 1 << bit
+            picks += 1
+        return cls(survey, mask)
+
+    def to_iso(self):
+        """Returns the picked days as ISO strings, in calendar order."""
+        return [self.survey.selectable_iso[i] for i in self._bits()]
+
+    def _bits(self):
+        mask, i = self.mask, 0
+        while mask:
+            if mask & 1:
+                yield i
+            mask >>= 1
+            i += 1
+
+    def __contains__(self, d):
+        bit = self.survey.day_bits.get(d)
+        return bit is not None and bool(self.mask >> bit & 1)
+
+    def __iter__(self):
+        """Yields the picked days as date objects, in calendar order."""
+        days = self.survey.selectable_days
+        return (days[i] for i in self._bits())
+
+    def __len__(self):
+        return bin(self.mask).count("1")
+
+    def __bool__(self):
+        return self.mask != 0
+
+    def __eq__(self, other):
+        return isinstance(other, Selection) and self.survey is other.survey and self.mask == other.mask
+
+    def __hash__(self):
+        return hash((self.survey.id, self.mask))
+
+    def __repr__(self):
+        return f"Selection({self.survey.id!r}, {self.to_iso()})"
+
+    def toggle(self, d):
+        """
+        Returns the selection with `d` removed if it was picked, added
+        otherwise. Raises SelectionFull when adding beyond max_picks and
+        ValueError for a day that is not selectable.
+        """
+        bit = self.survey.day_bits.get(d)
+        if bit is None:
+            raise ValueError(f"{d} is not selectable in survey {self.survey.id}")
+        if self.mask >> bit & 1:
+            return Selection(self.survey, self.mask & ~(1 << bit))
+        if len(self) >= self.survey.max_picks:
+            raise SelectionFull(f"At most {self.survey.max_picks} days can be picked")
+        return Selection(self.survey, self.mask | 1 << bit)
@@ -0,0 +1,251 @@
+import threading
+import time
+
+import metrics
+
+# ==========================================
+# Vote Aggregates
+# ==========================================
+class VoteStats:
+    """
+    Aggregated voting results of one data version.
+    Instances are shared between sessions and must be treated as read-only.
+    """
+
+    def __init__(self, counts, voters, combos=None):
+        self.counts = counts    # ISO date -> number of votes
+        self.voters = voters    # ISO date -> list of names, in submission order
+        self.combos = combos or {}  # sorted tuple of ISO dates -> number of voters who picked exactly those
+        # Most votes first, earlier date first on ties
+        self.ranking = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+        self._tables = {}
+        self._matrices = {}
+        self._covers = {}
+
+    def top(self, n=3):
+        """Returns the `n` most popular (date, votes) pairs."""
+        return self.ranking[:n]
+
+    def table(self, days):
+        """
+        Returns the full results table for the given ISO dates as a dict of
+        columns (Date / Votes / Voters), ready for st.dataframe.
+        Built once per tuple of days and shared; do not modify it.
+        """
+        days = tuple(days)
+        table = self._tables.get(days)
+        if table is None:
+            table = self._tables[days] = {
+                "Date": list(days),
+                "Votes": [self.counts.get(d, 0) for d in days],
+                "Voters": [", ".join(self.voters.get(d, ())) for d in days],
+            }
+        return table
+
+    def matrix(self, days):
+        """Returns the scoring.VoteMatrix of the votes over the given ISO dates (built once per tuple of days)."""
+        days = tuple(days)
+        matrix = self._matrices.get(days)
+        if matrix is None:
+            # NumPy is only needed once someone looks at the scores
+            from scoring import VoteMatrix
+            matrix = self._matrices[days] = VoteMatrix.from_combos(days, self.combos)
+        return matrix
+
+    def best_cover(self, days, k):
+        """
+        Returns (ISO dates, voters) of the `k` dates among `days` that the
+        most voters can attend at least one of (see VoteMatrix.best_cover).
+        """
+        key = (tuple(days), k)
+        cover = self._covers.get(key)
+        if cover is None:
+            cover = self._covers[key] = self.matrix(days).best_cover(k)
+        return cover
+
+
+class Tally:
+    """
+    Running per-date vote counter and voter set, kept up to date from the
+    store's change feed: replacing a submission subtracts the old dates and
+    adds the new ones, so a submit costs O(1) instead of a full recount.
+    It also counts voters per combination of picked dates, which is all
+    the scoring module needs, whatever the number of voters.
+    Writes of other processes are caught up with the same way, from the
+    store's changes_since. A full rebuild is only needed at startup, after
+    untracked writes (clear all) or when the store cannot list the changes.
+    """
+
+    def __init__(self):
+        self.counts = {}
+        self.voters = {}        # ISO date -> {name: None}, an insertion-ordered set
+        self.combos = {}        # sorted tuple of ISO dates -> number of voters
+        self.version = None     # store version the tally reflects exactly; None = nothing yet
+        self.lock = threading.Lock()
+        self._snapshot = None
+
+    def rebuild(self, rows, version):
+        self.counts = {}
+        self.voters = {}
+        self.combos = {}
+        for row in rows:
+            self._add(row)
+        self.version = version
+        self._snapshot = None
+
+    def _add(self, row):
+        for d in row.dates:
+            self.counts[d] = self.counts.get(d, 0) + 1
+            self.voters.setdefault(d, {})[row.name] = None
+        combo = tuple(sorted(row.dates))
+        self.combos[combo] = self.combos.get(combo, 0) + 1
+
+    def _remove(self, row):
+        for d in row.dates:
+            n = self.counts.get(d, 0) - 1
+            if n > 0:
+                self.counts[d] = n
+                self.voters[d].pop(row.name, None)
+            else:
+                self.counts.pop(d, None)
+                self.voters.pop(d, None)
+        combo = tuple(sorted(row.dates))
+        n = self.combos.get(combo, 0) - 1
+        if n > 0:
+            self.combos[combo] = n
+        else:
+            self.combos.pop(combo, None)
+
+    def apply(self, before, after, changes):
+        """
+        Store listener: folds one committed write into the tally. A write
+        that does not follow the tally's version (another process wrote in
+        between) or cannot be described row by row is left out; the tally
+        then still matches its older version and get_stats catches up.
+        """
+        with self.lock:
+            if changes is None or self.version is None or self.version != before:
+                return
+            self._apply_changes(changes)
+            self.version = after
+
+    def _apply_changes(self, changes):
+        for old, new in changes:
+            if old is not None:
+                self._remove(old)
+            if new is not None:
+                self._add(new)
+        self._snapshot = None
+
+    def catch_up(self, since):
+        """
+        Applies `since`, the result of store.changes_since(self.version).
+        Returns False if there is nothing to apply (the caller rebuilds).
+        """
+        if since is None:
+            return False
+        version, changes = since
+        self._apply_changes(changes)
+        self.version = version
+        return True
+
+    def snapshot(self):
+        """Returns a read-only VoteStats of the current tally (built once per version)."""
+        metrics.cache_lookup("stats_snapshot", self._snapshot is not None)
+        if self._snapshot is None:
+            self._snapshot = VoteStats(
+                dict(self.counts),
+                {d: list(names) for d, names in self.voters.items()},
+                dict(self.combos),
+            )
+        return self._snapshot
+
+
+# ==========================================
+# Process-wide Tallies
+# ==========================================
+# One tally per store, shared by every session of this server process.
+# In-process writes update it incrementally through the store's change feed;
+# on a version mismatch (e.g. a write from another process) it catches up
+# from the store's change record, or rebuilds if there is none.
+_tallies = {}
+_tallies_lock = threading.Lock()
+
+
+def get_tally(store):
+    tally = _tallies.get(id(store))
+    if tally is None:
+        with _tallies_lock:
+            tally = _tallies.get(id(store))
+            if tally is None:
+                tally = Tally()
+                store.subscribe(tally.apply)
+                _tallies[id(store)] = tally
+    return tally
+
+
+def get_stats(store):
+    """Returns the VoteStats of the store's current data."""
+    tally = get_tally(store)
+    version = store.version()
+    with tally.lock:
+        metrics.cache_lookup("tally", tally.version == version)
+        if tally.version != version:
+            with metrics.timed("stats_catch_up_seconds"):
+                caught_up = tally.version is not None and tally.catch_up(store.changes_since(tally.version))
+            if not caught_up:
+                with metrics.timed("stats_rebuild_seconds"):
+                    version, rows = store.read_all()
+                    tally.rebuild(rows, version)
+        return tally.snapshot()
+
+
+# ==========================================
+# Change Notification
+# ==========================================
+class ChangeNotifier:
+    """
+    Process-wide view of a store's version for live pages. Writes of this
+    process arrive through the change feed; writes of other processes are
+    noticed by asking the store at most every `poll_interval` seconds, no
+    matter how many pages are watching. Reading it costs nothing else.
+    """
+
+    def __init__(self, store, poll_interval=1.0):
+        self.store = store
+        self.poll_interval = poll_interval
+        self.lock = threading.Lock()
+        self.version = store.version()
+        self.changed_at = self._polled_at = time.monotonic()
+        store.subscribe(self._on_write)
+
+    def _on_write(self, before, after, changes):
+        with self.lock:
+            self.version = after
+            self.changed_at = time.monotonic()
+
+    def current(self):
+        """Returns (version, monotonic time of the last change seen)."""
+        now = time.monotonic()
+        if now - self._polled_at >= self.poll_interval:
+            with self.lock:
+                if now - self._polled_at >= self.poll_interval:
+                    self._polled_at = now
+                    version = self.store.version()
+                    if version != self.version:
+                        self.version = version
+                        self.changed_at = now
+        return self.version, self.changed_at
+
+
+_notifiers = {}
+
+
+def get_notifier(store):
+    notifier = _notifiers.get(id(store))
+    if notifier is None:
+        with _tallies_lock:
+            notifier = _notifiers.get(id(store))
+            if notifier is None:
+                notifier = _notifiers[id(store)] = ChangeNotifier(store)
+    return notifier
@@ -0,0 +1,1029 @@
+import bisect
+import csv
+import io
+import itertools
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import unicodedata
+from contextlib import contextmanager
+from datetime import date, datetime
+from pathlib import Path
+
+import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# ==========================================
+# Configuration
+# ==========================================
+DATA_DIR = Path(os.environ.get("DINNER_SURVEY_DATA_DIR", "data"))
+CSV_FILE = DATA_DIR / "submissions.csv"
+DB_FILE = DATA_DIR / "submissions.db"
+
+# Column layout of the CSV import/export format
+CSV_COLUMNS = ["Name", "Date 1", "Date 2", "Date 3", "Timestamp"]
+DATE_COLUMNS = CSV_COLUMNS[1:4]
+
+# Rows per upsert_many batch of a bulk import, and per chunk of an export:
+# memory use of both is bounded by these, not by the number of submissions
+IMPORT_BATCH_ROWS = 1000
+EXPORT_CHUNK_ROWS = 5000
+
+# Rows of the SQLite change log other processes catch up from (see
+# SQLiteStore.changes_since); older changes are dropped, making lagging
+# readers re-read everything. So are bulk writes (imports) of more rows
+# than CHANGELOG_MAX_WRITE, for which one re-read is cheaper anyway.
+CHANGELOG_ROWS = 10_000
+CHANGELOG_MAX_WRITE = 100
+
+# Idle SQLite connections kept open per store; busier moments open more,
+# which are closed again when returned to a full pool
+SQLITE_POOL_SIZE = 8
+
+
+TIMESTAMP_RE = re.compile(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}")
+
+
+def format_timestamp(ts=None):
+    """Returns the submission timestamp string used throughout the store."""
+    return (ts or datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class Submission:
+    """
+    One voter's submission: name, ISO date strings and timestamp.
+    Uses __slots__ so large surveys cost a small fixed amount per voter;
+    instances are shared between stores, caches and sessions and must
+    not be mutated.
+    """
+
+    __slots__ = ("name", "dates", "timestamp")
+
+    def __init__(self, name, dates, timestamp):
+        self.name = name
+        self.dates = dates          # tuple of ISO date strings, at most 3
+        self.timestamp = timestamp
+
+    @classmethod
+    def create(cls, name, dates, timestamp=None):
+        """
+        Builds a submission from a list of dates, which may be `date`
+        objects, ISO strings or empty slots ("" / None).
+        """
+        dates = tuple(d.isoformat() if isinstance(d, date) else d for d in dates if d)
+        return cls(name, dates[:len(DATE_COLUMNS)], timestamp or format_timestamp())
+
+    def csv_fields(self):
+        """Returns the values of the CSV_COLUMNS layout."""
+        padded = self.dates + ("",) * (len(DATE_COLUMNS) - len(self.dates))
+        return [self.name, *padded, self.timestamp]
+
+    def __eq__(self, other):
+        if not isinstance(other, Submission):
+            return NotImplemented
+        return (self.name, self.dates, self.timestamp) == (other.name, other.dates, other.timestamp)
+
+    def __repr__(self):
+        return f"Submission({self.name!r}, {self.dates!r}, {self.timestamp!r})"
+
+
+def normalize_name(name):
+    """
+    Returns the lookup key of a name: Unicode NFKC, case-folded, with
+    whitespace runs collapsed. "  Isaac " and "isaac" are the same voter.
+    """
+    return " ".join(unicodedata.normalize("NFKC", name).split()).casefold()
+
+
+def dedupe_rows(rows):
+    """
+    Keeps one submission per normalized name: the one with the latest
+    timestamp, the later row on ties. Survivors keep their relative order.
+    """
+    best = {}
+    for i, row in enumerate(rows):
+        key = normalize_name(row.name)
+        rank = (row.timestamp, i)
+        if key not in best or rank >= best[key][0]:
+            best[key] = (rank, row)
+    return [row for _, row in sorted(best.values(), key=lambda item: item[0][1])]
+
+
+def parse_submission(record, allowed_dates=None):
+    """
+    Validates one CSV record (a dict in the CSV_COLUMNS layout) and returns
+    its Submission. Dates must be ISO dates, and members of `allowed_dates`
+    if given; a missing timestamp means "now". Raises ValueError.
+    """
+    name = record.get("Name") or ""
+    if not name.strip():
+        raise ValueError("name is empty")
+    dates = []
+    for col in DATE_COLUMNS:
+        value = (record.get(col) or "").strip()
+        if not value:
+            continue
+        try:
+            value = date.fromisoformat(value).isoformat()
+        except ValueError:
+            raise ValueError(f"{col} {value!r} is not a date (YYYY-MM-DD)") from None
+        if allowed_dates is not None and value not in allowed_dates:
+            raise ValueError(f"{col} {value} is not a date of this survey")
+        if value in dates:
+            raise ValueError(f"{col} {value} is picked twice")
+        dates.append(value)
+    timestamp = (record.get("Timestamp") or "").strip()
+    if timestamp:
+        # Same check as strptime("%Y-%m-%d %H:%M:%S"), several times faster
+        try:
+            if not TIMESTAMP_RE.fullmatch(timestamp):
+                raise ValueError
+            datetime.fromisoformat(timestamp)
+        except ValueError:
+            raise ValueError(f"Timestamp {timestamp!r} is not YYYY-MM-DD HH:MM:SS") from None
+    return Submission(name, tuple(dates), timestamp or format_timestamp())
+
+
+def prefix_end(prefix):
+    """
+    Returns the smallest string greater than every string starting with
+    `prefix`, so `prefix <= s < prefix_end(prefix)` is an indexable range
+    scan. None if there is no such string.
+    """
+    while prefix:
+        last = ord(prefix[-1]) + 1
+        if 0xD800 <= last <= 0xDFFF:
+            # Skip surrogates, which cannot be stored
+            last = 0xE000
+        if last <= 0x10FFFF:
+            return prefix[:-1] + chr(last)
+        prefix = prefix[:-1]
+    return None
+
+
+def filter_index(index, name_prefix, on_date):
+    """
+    Yields the rows of `index` (normalized name -> row, in submission
+    order) matching the admin filters (see SubmissionStore.page).
+    """
+    key_prefix = normalize_name(name_prefix)
+    return (
+        row for key, row in index.items()
+        if key.startswith(key_prefix) and (not on_date or on_date in row.dates)
+    )
+
+
+def search_sorted_keys(keys, index, name_prefix, limit):
+    """Prefix search by bisection in `keys`, the sorted keys of `index`."""
+    key_prefix = normalize_name(name_prefix)
+    names = []
+    for key in itertools.islice(keys, bisect.bisect_left(keys, key_prefix), None):
+        if not key.startswith(key_prefix) or len(names) >= limit:
+            break
+        names.append(index[key].name)
+    return names
+
+
+def _row_matches(row, key_prefix, on_date):
+    return (not on_date or on_date in row.dates) and normalize_name(row.name).startswith(key_prefix)
+
+
+class ImportReport:
+    """Outcome of a bulk import (see SubmissionStore.import_csv)."""
+
+    MAX_ERRORS = 20
+
+    def __init__(self):
+        self.imported = 0       # rows written
+        self.outdated = 0       # valid rows older than the stored submission
+        self.invalid = 0        # rows rejected by validation
+        self.errors = []        # the first MAX_ERRORS rejections, "line N: reason"
+
+    def reject(self, line, reason):
+        self.invalid += 1
+        if len(self.errors) < self.MAX_ERRORS:
+            self.errors.append(f"line {line}: {reason}")
+
+    def __repr__(self):
+        return f"ImportReport(imported={self.imported}, outdated={self.outdated}, invalid={self.invalid})"
+
+
+@contextmanager
+def _open_csv_text(source):
+    """Opens a path, or wraps a binary or text file object, as CSV text."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, newline="", encoding="utf-8-sig") as f:
+            yield f
+    elif isinstance(source, io.TextIOBase):
+        yield source
+    else:
+        # Uploaded files are binary; don't close the caller's file with the wrapper
+        f = io.TextIOWrapper(source, newline="", encoding="utf-8-sig")
+        try:
+            yield f
+        finally:
+            f.detach()
+
+
+class StorageError(Exception):
+    """Raised when stored data cannot be read or written safely."""
+
+
+# ==========================================
+# Storage Interface
+# ==========================================
+class SubmissionStore:
+    """
+    Interface shared by all submission backends.
+    Rows are Submission records.
+
+    Every committed write is published to the subscribed listeners as
+    `listener(before, after, changes)`: the versions around the write and
+    a list of (old_row, new_row) pairs (None for an insert or a delete),
+    or `changes=None` when the write cannot be described row by row.
+    """
+
+    # True if the store records every write and can answer history()
+    keeps_history = False
+
+    def __init__(self):
+        self._listeners = []
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def _publish(self, before, after, changes):
+        for listener in self._listeners:
+            listener(before, after, changes)
+
+    def get(self, name):
+        """Returns the row for `name`, or None."""
+        raise NotImplementedError
+
+    def upsert(self, name, dates, timestamp=None):
+        """Inserts or replaces the submission for `name`. Returns the new row."""
+        raise NotImplementedError
+
+    def upsert_many(self, rows, keep_newer=False):
+        """
+        Upserts a batch of rows (later rows win). With `keep_newer`, a row
+        older than the submission already stored for its name is skipped.
+        Returns the number of rows written.
+        """
+        n = 0
+        for row in rows:
+            if keep_newer:
+                old = self.get(row.name)
+                if old is not None and old.timestamp > row.timestamp:
+                    continue
+            self.upsert(row.name, row.dates, row.timestamp)
+            n += 1
+        return n
+
+    def delete(self, names):
+        """Removes the submissions of all `names`. Returns the number removed."""
+        raise NotImplementedError
+
+    def clear(self):
+        """Removes every submission."""
+        raise NotImplementedError
+
+    def iter_all(self):
+        """Yields every row in submission order."""
+        raise NotImplementedError
+
+    def count(self, name_prefix="", on_date=None):
+        """Returns the number of rows, or of those matching the filters of page()."""
+        key = normalize_name(name_prefix)
+        return sum(1 for row in self.iter_all() if _row_matches(row, key, on_date))
+
+    def page(self, offset, limit, name_prefix="", on_date=None):
+        """
+        Returns at most `limit` rows in submission order, starting at row
+        `offset`. Optionally only rows whose name starts with `name_prefix`
+        (compared normalized, see normalize_name) and that picked the ISO
+        date `on_date`.
+        """
+        key = normalize_name(name_prefix)
+        rows = (row for row in self.iter_all() if _row_matches(row, key, on_date))
+        return list(itertools.islice(rows, offset, offset + limit))
+
+    def search_names(self, name_prefix, limit):
+        """Returns up to `limit` stored names starting with `name_prefix`, ordered by normalized name."""
+        key = normalize_name(name_prefix)
+        return [row.name for row in sorted(
+            (row for row in self.iter_all() if _row_matches(row, key, None)),
+            key=lambda row: normalize_name(row.name),
+        )[:limit]]
+
+    def version(self):
+        """
+        Returns an opaque token that changes whenever the stored data changes.
+        Used as the key of derived caches (see stats.py).
+        """
+        raise NotImplementedError
+
+    def changes_since(self, version):
+        """
+        Returns (current version, changes): the (old_row, new_row) pairs
+        committed after `version` by any process, oldest first. Returns
+        None when the store cannot tell (too old a version, a clear, or a
+        backend without a change record); the caller then re-reads all rows.
+        Lets the caches of other server processes catch up with a write
+        instead of rebuilding (see stats.get_stats).
+        """
+        return None
+
+    def history(self, name):
+        """
+        Returns the recorded writes of `name`, oldest first, as dicts with
+        "op" (submit / edit / delete / clear), "name", "dates" and
+        "timestamp". Only stores with keeps_history support it.
+        """
+        raise NotImplementedError
+
+    def read_all(self):
+        """Returns (version, rows) read consistently, i.e. rows are exactly that version."""
+        while True:
+            version = self.version()
+            rows = list(self.iter_all())
+            if self.version() == version:
+                return version, rows
+
+    # --- CSV import / export ---
+    # Rows per upsert_many batch of import_csv
+    import_batch_rows = IMPORT_BATCH_ROWS
+
+    def import_csv(self, source, allowed_dates=None, batch_size=None):
+        """
+        Streams a CSV file in the submission layout into the store, `source`
+        being a path or a (binary or text) file object. Rows are validated
+        with parse_submission and upserted in batches of `batch_size`, so
+        memory does not grow with the file. Invalid rows are skipped.
+
+        Duplicate names are resolved like dedupe_rows, also against the
+        submissions already stored: the latest timestamp wins, the later
+        row on ties. Batches are committed as they go; returns an ImportReport.
+        """
+        batch_size = batch_size or self.import_batch_rows
+        report = ImportReport()
+        with _open_csv_text(source) as f:
+            reader = csv.DictReader(f)
+            batch = []
+            try:
+                # The header read already decodes the first chunk of the file
+                missing = [col for col in ("Name", *DATE_COLUMNS) if col not in (reader.fieldnames or ())]
+                if missing:
+                    raise StorageError(f"CSV file is missing columns: {', '.join(missing)}")
+                for record in reader:
+                    try:
+                        batch.append(parse_submission(record, allowed_dates))
+                    except ValueError as e:
+                        report.reject(reader.line_num, e)
+                        continue
+                    if len(batch) >= batch_size:
+                        self._import_batch(batch, report)
+                        batch = []
+            except UnicodeDecodeError as e:
+                raise StorageError('CSV file is not UTF-8 encoded; save it as "CSV UTF-8" and try again') from e
+            except csv.Error as e:
+                raise StorageError(f"Cannot parse CSV file at line {reader.line_num}: {e}") from e
+            if batch:
+                self._import_batch(batch, report)
+        return report
+
+    def _import_batch(self, batch, report):
+        written = self.upsert_many(batch, keep_newer=True)
+        report.imported += written
+        report.outdated += len(batch) - written
+
+    def iter_csv_chunks(self, chunk_rows=EXPORT_CHUNK_ROWS):
+        """Yields the CSV export as UTF-8 byte chunks of `chunk_rows` rows each."""
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(CSV_COLUMNS)
+        for i, row in enumerate(self.iter_all(), 1):
+            writer.writerow(row.csv_fields())
+            if i % chunk_rows == 0:
+                yield buf.getvalue().encode("utf-8")
+                buf.seek(0)
+                buf.truncate()
+        yield buf.getvalue().encode("utf-8")
+
+    def export_csv(self, f):
+        """Writes all rows as CSV to the binary file object `f`, chunk by chunk."""
+        for chunk in self.iter_csv_chunks():
+            f.write(chunk)
+
+    def export_csv_bytes(self):
+        """
+        Returns the CSV export as bytes, for st.download_button (which
+        needs the whole file in memory either way).
+        """
+        return b"".join(self.iter_csv_chunks())
+
+
+# ==========================================
+# SQLite Backend (default)
+# ==========================================
+class SQLiteStore(SubmissionStore):
+    """
+    SQLite store in WAL mode: readers never block the writer, and an
+    upsert is a single indexed write instead of a whole-file rewrite.
+    Streamlit runs every rerun on a new script thread, so connections are
+    not tied to threads: each call checks one out of a small pool (see
+    _connection) and returns it when done, and the PRAGMAs run once per
+    connection.
+
+    Several server processes can share the database. Every write bumps the
+    revision in `meta` and records its row changes in `changelog` in the
+    same transaction, so other processes notice the new revision and
+    catch up with changes_since.
+    """
+
+    # name_key is the normalized name (see normalize_name); its primary key
+    # index makes a returning user's lookup a single index probe.
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS submissions ("
+        " name_key TEXT PRIMARY KEY,"
+        " name TEXT NOT NULL,"
+        " date1 TEXT NOT NULL DEFAULT '',"
+        " date2 TEXT NOT NULL DEFAULT '',"
+        " date3 TEXT NOT NULL DEFAULT '',"
+        " timestamp TEXT NOT NULL)"
+    )
+
+    def __init__(self, path=DB_FILE, legacy_csv=CSV_FILE):
+        super().__init__()
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()     # connection checked out by this thread, if any
+        self._pool = []
+        self._pool_lock = threading.Lock()
+        created = self._init_schema()
+        # One-off migration of the old CSV file into a brand new database
+        if created and legacy_csv is not None and Path(legacy_csv).exists():
+            report = self.import_csv(legacy_csv)
+            if report.invalid:
+                print(f"Skipped {report.invalid} invalid row(s) of {legacy_csv}: {'; '.join(report.errors)}")
+
+    # --- Connections ---
+    def _take(self):
+        with self._pool_lock:
+            if self._pool:
+                return self._pool.pop()
+        # Used by one thread at a time, but not always the one that opened it
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _give(self, conn):
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        with self._pool_lock:
+            if len(self._pool) < SQLITE_POOL_SIZE:
+                self._pool.append(conn)
+                return
+        conn.close()
+
+    @contextmanager
+    def _connection(self):
+        """
+        Checks out a pooled connection for the current thread. Nested uses
+        (e.g. version() inside a write transaction) share it.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            yield conn
+            return
+        conn = self._local.conn = self._take()
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self._give(conn)
+
+    def _init_schema(self):
+        with self._connection() as conn:
+            return self._create_schema(conn)
+
+    def _create_schema(self, conn):
+        existed = bool(conn.execute("PRAGMA table_info(submissions)").fetchall())
+        conn.execute(self.SCHEMA)
+        # Revision counter, bumped by every write transaction
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('revision', 0)")
+        # Row changes per revision; complete for every revision after changelog_floor
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS changelog ("
+            " id INTEGER PRIMARY KEY,"
+            " revision INTEGER NOT NULL,"
+            " old_name TEXT, old_dates TEXT, old_timestamp TEXT,"
+            " new_name TEXT, new_dates TEXT, new_timestamp TEXT)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS changelog_revision ON changelog (revision)")
+        conn.execute(
+            "INSERT OR IGNORE INTO meta (key, value)"
+            " SELECT 'changelog_floor', value FROM meta WHERE key = 'revision'"
+        )
+        return not existed
+
+    @contextmanager
+    def _write(self, tracked=True):
+        """
+        Runs the body in one write transaction, bumps the revision and
+        publishes the change list the body fills in (or None if untracked).
+        """
+        with self._connection() as conn, metrics.timed("storage_write_seconds", backend="sqlite"):
+            # Waits (up to the connection timeout) for other writers
+            with metrics.timed("storage_lock_wait_seconds", lock=self.path.name):
+                conn.execute("BEGIN IMMEDIATE")
+            changes = []
+            try:
+                before = self.version()
+                yield conn, changes
+                conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'revision'")
+                self._log_changes(conn, before + 1, changes if tracked else None)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        metrics.inc("storage_rows_written_total", len(changes), backend="sqlite")
+        self._publish(before, before + 1, changes if tracked else None)
+
+    def version(self):
+        with self._connection() as conn:
+            return conn.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()[0]
+
+    # --- Change log ---
+    @staticmethod
+    def _log_fields(row):
+        return (None, None, None) if row is None else (row.name, ",".join(row.dates), row.timestamp)
+
+    @staticmethod
+    def _logged_row(fields):
+        name, dates, timestamp = fields
+        return None if name is None else Submission(name, tuple(d for d in dates.split(",") if d), timestamp)
+
+    def _log_changes(self, conn, revision, changes):
+        """Records the changes of `revision` (inside its write transaction) and trims the log."""
+        if changes is None or len(changes) > CHANGELOG_MAX_WRITE:
+            # Not describable row by row: readers behind this revision re-read everything
+            conn.execute("DELETE FROM changelog")
+            conn.execute("UPDATE meta SET value = ? WHERE key = 'changelog_floor'", (revision,))
+            return
+        conn.executemany(
+            "INSERT INTO changelog (revision, old_name, old_dates, old_timestamp, new_name, new_dates, new_timestamp)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(revision,) + self._log_fields(old) + self._log_fields(new) for old, new in changes],
+        )
+        # Keep the newest CHANGELOG_ROWS rows; a revision cut in half is no longer complete
+        cutoff = conn.execute("SELECT MAX(id) - ? FROM changelog", (CHANGELOG_ROWS,)).fetchone()[0]
+        if cutoff is not None and cutoff > 0:
+            last = conn.execute("SELECT revision FROM changelog WHERE id <= ? ORDER BY id DESC LIMIT 1",
+                                (cutoff,)).fetchone()
+            if last is not None:
+                conn.execute("DELETE FROM changelog WHERE id <= ?", (cutoff,))
+                conn.execute("UPDATE meta SET value = MAX(value, ?) WHERE key = 'changelog_floor'", (last[0],))
+
+    def changes_since(self, version):
+        with self._connection() as conn:
+            # One read transaction: the changes are exactly those up to `current`
+            conn.execute("BEGIN")
+            try:
+                current = self.version()
+                floor = conn.execute("SELECT value FROM meta WHERE key = 'changelog_floor'").fetchone()[0]
+                if version is None or not floor <= version <= current:
+                    return None
+                rows = conn.execute(
+                    "SELECT old_name, old_dates, old_timestamp, new_name, new_dates, new_timestamp"
+                    " FROM changelog WHERE revision > ? ORDER BY id",
+                    (version,),
+                ).fetchall()
+            finally:
+                conn.execute("COMMIT")
+        metrics.inc("storage_rows_read_total", len(rows), backend="sqlite")
+        return current, [(self._logged_row(r[:3]), self._logged_row(r[3:])) for r in rows]
+
+    @staticmethod
+    def _to_row(r):
+        return Submission(r[0], tuple(d for d in r[1:4] if d), r[4])
+
+    def get(self, name):
+        with self._connection() as conn:
+            return self._get(conn, name)
+
+    def _get(self, conn, name):
+        r = conn.execute(
+            "SELECT name, date1, date2, date3, timestamp FROM submissions WHERE name_key = ?",
+            (normalize_name(name),),
+        ).fetchone()
+        return self._to_row(r) if r else None
+
+    def upsert(self, name, dates, timestamp=None):
+        row = Submission.create(name, dates, timestamp)
+        self.upsert_many([row])
+        return row
+
+    def upsert_many(self, rows, keep_newer=False):
+        # REPLACE deletes the old row and appends a new one, so the user
+        # moves to the end of the submission order like the old CSV rewrite.
+        # The whole batch is one transaction (one fsync).
+        n = 0
+        with self._write() as (conn, changes):
+            for row in rows:
+                old = self._get(conn, row.name)
+                if keep_newer and old is not None and old.timestamp > row.timestamp:
+                    continue
+                changes.append((old, row))
+                conn.execute(
+                    "INSERT OR REPLACE INTO submissions (name_key, name, date1, date2, date3, timestamp)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    [normalize_name(row.name)] + row.csv_fields(),
+                )
+                n += 1
+        return n
+
+    def delete(self, names):
+        names = list(names)
+        if not names:
+            return 0
+        with self._write() as (conn, changes):
+            for name in names:
+                old = self._get(conn, name)
+                if old is not None:
+                    conn.execute("DELETE FROM submissions WHERE name_key = ?", (normalize_name(name),))
+                    changes.append((old, None))
+        return len(changes)
+
+    def clear(self):
+        with self._write(tracked=False) as (conn, _):
+            conn.execute("DELETE FROM submissions")
+
+    def iter_all(self):
+        # A generator may be abandoned and closed on another thread, so it
+        # holds a connection of its own unless it runs inside read_all
+        conn = getattr(self._local, "conn", None)
+        own = conn is None
+        if own:
+            conn = self._take()
+        try:
+            cur = conn.execute("SELECT name, date1, date2, date3, timestamp FROM submissions ORDER BY rowid")
+            for r in cur:
+                yield self._to_row(r)
+        finally:
+            if own:
+                self._give(conn)
+
+    @staticmethod
+    def _where(name_prefix="", on_date=None):
+        """WHERE clause and parameters of the admin filters (see page)."""
+        clauses, params = [], []
+        key = normalize_name(name_prefix)
+        if key:
+            # A range on the primary key index, not a LIKE scan
+            clauses.append("name_key >= ?")
+            params.append(key)
+            end = prefix_end(key)
+            if end is not None:
+                clauses.append("name_key < ?")
+                params.append(end)
+        if on_date:
+            clauses.append("? IN (date1, date2, date3)")
+            params.append(on_date)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def count(self, name_prefix="", on_date=None):
+        where, params = self._where(name_prefix, on_date)
+        with self._connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM submissions" + where, params).fetchone()[0]
+
+    def page(self, offset, limit, name_prefix="", on_date=None):
+        where, params = self._where(name_prefix, on_date)
+        with self._connection() as conn:
+            cur = conn.execute(
+                "SELECT name, date1, date2, date3, timestamp FROM submissions" + where
+                + " ORDER BY rowid LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            )
+            return [self._to_row(r) for r in cur]
+
+    def search_names(self, name_prefix, limit):
+        where, params = self._where(name_prefix)
+        with self._connection() as conn:
+            cur = conn.execute(
+                "SELECT name FROM submissions" + where + " ORDER BY name_key LIMIT ?", params + [limit]
+            )
+            return [r[0] for r in cur]
+
+    def read_all(self):
+        # A read transaction sees a single WAL snapshot
+        with self._connection() as conn:
+            conn.execute("BEGIN")
+            try:
+                version, rows = self.version(), list(self.iter_all())
+            finally:
+                conn.execute("COMMIT")
+        metrics.inc("storage_rows_read_total", len(rows), backend="sqlite")
+        return version, rows
+
+
+# ==========================================
+# CSV Backend
+# ==========================================
+class FileLock:
+    """
+    Exclusive inter-process lock on a side-car lock file.
+    Uses flock() on POSIX and msvcrt.locking() on Windows; threads of the
+    same process are serialized by an ordinary lock first.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = None
+        self._thread_lock = threading.Lock()
+
+    def __enter__(self):
+        # Waiting time for other threads and processes
+        with metrics.timed("storage_lock_wait_seconds", lock=self.path.name):
+            self._acquire()
+        return self
+
+    def _acquire(self):
+        self._thread_lock.acquire()
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "a+b")
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            else:
+                self._file.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        # LK_LOCK gives up after ~10s; keep waiting
+                        pass
+        except BaseException:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._thread_lock.release()
+            raise
+
+    def __exit__(self, *exc):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+            self._thread_lock.release()
+
+
+def atomic_write_csv(path, rows):
+    """
+    Writes rows to a temp file next to `path`, fsyncs it and renames it
+    over `path`, so readers see either the old or the new file, never a
+    partially written one.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(CSV_COLUMNS)
+            writer.writerows(row.csv_fields() for row in rows)
+            f.flush()
+            os.fsync(f.fileno())
+            metrics.inc("storage_bytes_written_total", os.fstat(f.fileno()).st_size, backend="csv")
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+    if hasattr(os, "O_DIRECTORY"):
+        # Persist the rename itself
+        dir_fd = os.open(path.parent, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+class CsvStore(SubmissionStore):
+    """
+    Plain CSV file store (the original on-disk format).
+    Every write rewrites the whole file; kept for small deployments
+    and for compatibility with existing data files.
+
+    Writers are serialized with an inter-process lock file and replace
+    the data file atomically. A file that cannot be parsed raises
+    StorageError instead of being overwritten.
+    """
+
+    def __init__(self, path=CSV_FILE):
+        super().__init__()
+        self.path = Path(path)
+        self.lock = FileLock(self.path.with_name(self.path.name + ".lock"))
+        # (version, rows, index) of the last parse; index maps normalized
+        # name -> row (in row order) so lookups skip the parse while the
+        # file is unchanged
+        self._cache = (None, [], {})
+        # (version, sorted normalized names) for prefix searches, built on demand
+        self._sorted_keys = (None, [])
+
+    # Every batch rewrites the whole file, so import in fewer, larger ones
+    import_batch_rows = 50_000
+
+    @staticmethod
+    def _file_version(st):
+        # The inode changes with every atomic replace
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _load(self):
+        """Returns (version, rows, index), re-parsing only when the file changed."""
+        cached = self._cache
+        hit = cached[0] is not None and cached[0] == self.version()
+        metrics.cache_lookup("csv_parse", hit)
+        if hit:
+            return cached
+        try:
+            f = open(self.path, newline="", encoding="utf-8")
+        except FileNotFoundError:
+            self._cache = (None, [], {})
+            return self._cache
+        with f:
+            st = os.fstat(f.fileno())
+            version = self._file_version(st)
+            rows = dedupe_rows(self._parse(f))
+            metrics.inc("storage_bytes_read_total", st.st_size, backend="csv")
+        self._cache = (version, rows, {normalize_name(r.name): r for r in rows})
+        return self._cache
+
+    def _parse(self, f):
+        reader = csv.DictReader(f)
+        if reader.fieldnames is None:
+            # Empty file
+            return []
+        missing = [col for col in ("Name", *DATE_COLUMNS) if col not in reader.fieldnames]
+        if missing:
+            raise StorageError(f"{self.path} is missing columns: {', '.join(missing)}")
+        try:
+            return [
+                Submission(row["Name"], tuple(row[col] for col in DATE_COLUMNS if row[col]), row.get("Timestamp") or "")
+                for row in reader
+                if row["Name"]
+            ]
+        except (csv.Error, UnicodeDecodeError) as e:
+            raise StorageError(f"Cannot parse {self.path}: {e}") from e
+
+    def _write(self, rows):
+        with metrics.timed("storage_write_seconds", backend="csv"):
+            atomic_write_csv(self.path, rows)
+
+    def get(self, name):
+        return self._load()[2].get(normalize_name(name))
+
+    def upsert(self, name, dates, timestamp=None):
+        row = Submission.create(name, dates, timestamp)
+        self.upsert_many([row])
+        return row
+
+    def upsert_many(self, rows, keep_newer=False):
+        with self.lock:
+            before, current, index = self._load()
+            new_rows = {}
+            changes = []
+            for row in rows:
+                key = normalize_name(row.name)
+                old = new_rows.get(key, index.get(key))
+                if keep_newer and old is not None and old.timestamp > row.timestamp:
+                    continue
+                changes.append((old, row))
+                new_rows[key] = row
+            if not changes:
+                return 0
+            kept = [r for r in current if normalize_name(r.name) not in new_rows]
+            self._write(kept + list(new_rows.values()))
+            after = self.version()
+        self._publish(before, after, changes)
+        return len(changes)
+
+    def delete(self, names):
+        keys = {normalize_name(n) for n in names}
+        with self.lock:
+            before, rows, index = self._load()
+            kept = [r for r in rows if normalize_name(r.name) not in keys]
+            self._write(kept)
+            after = self.version()
+        self._publish(before, after, [(index[k], None) for k in keys if k in index])
+        return len(rows) - len(kept)
+
+    def clear(self):
+        with self.lock:
+            before = self.version()
+            if self.path.exists():
+                self.path.unlink()
+            after = self.version()
+        self._publish(before, after, None)
+
+    def iter_all(self):
+        return iter(self._load()[1])
+
+    def count(self, name_prefix="", on_date=None):
+        if not name_prefix and not on_date:
+            return len(self._load()[1])
+        return sum(1 for _ in self._filter(name_prefix, on_date))
+
+    def page(self, offset, limit, name_prefix="", on_date=None):
+        if not name_prefix and not on_date:
+            return self._load()[1][offset:offset + limit]
+        return list(itertools.islice(self._filter(name_prefix, on_date), offset, offset + limit))
+
+    def _filter(self, name_prefix, on_date):
+        return filter_index(self._load()[2], name_prefix, on_date)
+
+    def search_names(self, name_prefix, limit):
+        version, _, index = self._load()
+        if self._sorted_keys[0] != version or version is None:
+            self._sorted_keys = (version, sorted(index))
+        return search_sorted_keys(self._sorted_keys[1], index, name_prefix, limit)
+
+    def version(self):
+        try:
+            return self._file_version(self.path.stat())
+        except FileNotFoundError:
+            return None
+
+    def read_all(self):
+        version, rows, _ = self._load()
+        return version, rows
+
+
+# ==========================================
+# Backend Selection
+# ==========================================
+def _open_event_log(data_dir):
+    from eventlog import EventLogStore
+    return EventLogStore(data_dir, legacy_csv=data_dir / CSV_FILE.name)
+
+
+BACKENDS = {
+    "sqlite": lambda data_dir: SQLiteStore(data_dir / DB_FILE.name, legacy_csv=data_dir / CSV_FILE.name),
+    "csv": lambda data_dir: CsvStore(data_dir / CSV_FILE.name),
+    "eventlog": _open_event_log,
+}
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def open_store(data_dir=DATA_DIR):
+    """
+    Creates a store for the data directory `data_dir`. The backend is chosen
+    with the DINNER_SURVEY_STORE environment variable: "sqlite" (default),
+    "csv" or "eventlog".
+    DINNER_SURVEY_WRITE_BEHIND=1 queues submissions and writes them in
+    batches from a background thread (see writebehind.py).
+    """
+    kind = os.environ.get("DINNER_SURVEY_STORE", "sqlite")
+    store = BACKENDS[kind](Path(data_dir))
+    if os.environ.get("DINNER_SURVEY_WRITE_BEHIND") == "1":
+        from writebehind import WriteBehindStore
+        store = WriteBehindStore(
+            store,
+            flush_interval=float(os.environ.get("DINNER_SURVEY_FLUSH_MS", "5")) / 1000,
+            max_batch=int(os.environ.get("DINNER_SURVEY_FLUSH_BATCH", "200")),
+        )
+    return store
+
+
+def get_store(data_dir=DATA_DIR):
+    """
+    Returns the process-wide store of a data directory (one partition per
+    survey), opening it on first use.
+    """
+    key = Path(data_dir)
+    store = _stores.get(key)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(key)
+            if store is None:
+                store = _stores[key] = open_store(key)
+    return store
@@ -0,0 +1,129 @@
+import calendar
+import json
+import re
+import threading
+from datetime import date, timedelta
+
+from storage import DATA_DIR, DATE_COLUMNS
+
+# ==========================================
+# Configuration
+# ==========================================
+SURVEYS_FILE = DATA_DIR / "surveys.json"
+
+# Survey ids appear in URLs (?survey=<id>) and directory names
+SURVEY_ID_RE = re.compile(r"[A-Za-z0-9_-]+")
+
+# Used when no surveys.json exists: the original January 2026 survey
+DEFAULT_SURVEYS = {
+    "default": "2026-01",
+    "surveys": {
+        "2026-01": {
+            "start": "2026-01-01",
+            "end": "2026-01-31",
+            "holidays": ["2026-01-01", "2026-01-02"],
+            "max_picks": 3,
+            # Its votes predate multiple surveys and live directly in DATA_DIR
+            "data_dir": ".",
+        },
+    },
+}
+
+
+# ==========================================
+# Survey Definition
+# ==========================================
+class Survey:
+    """
+    One survey: a date range, its holidays and the pick limit.
+    All selectable days are computed once when the definition is loaded and
+    the instance is shared read-only by every session.
+    """
+
+    def __init__(self, survey_id, start, end, holidays=(), max_picks=3, weekdays=(0, 1, 2, 3, 4), title=None,
+                 data_dir=None):
+        if not SURVEY_ID_RE.fullmatch(survey_id):
+            raise ValueError(f"Survey id {survey_id!r} may only contain letters, digits, '-' and '_'")
+        if end < start:
+            raise ValueError(f"Survey {survey_id}: end {end} is before start {start}")
+        if not 1 <= max_picks <= len(DATE_COLUMNS):
+            raise ValueError(f"Survey {survey_id}: max_picks must be between 1 and {len(DATE_COLUMNS)}")
+        self.id = survey_id
+        self.start = start
+        self.end = end
+        self.max_picks = max_picks
+        self.holidays = frozenset(holidays)
+        self.days = tuple(start + timedelta(days=i) for i in range((end - start).days + 1))
+        # 0=Mon ... 6=Sun; weekends and holidays are not selectable
+        self.selectable = frozenset(d for d in self.days if d.weekday() in weekdays and d not in self.holidays)
+        self.selectable_days = tuple(d for d in self.days if d in self.selectable)
+        self.selectable_iso = tuple(d.isoformat() for d in self.selectable_days)
+        # Bit of each selectable day in a Selection bitmask
+        self.day_bits = {d: i for i, d in enumerate(self.selectable_days)}
+        self.months = tuple(sorted({(d.year, d.month) for d in self.days}))
+        self.label = title or self._month_label()
+        # Storage partition of this survey (see get_store); DATA_DIR/<id>
+        # unless the definition names a directory
+        self.data_dir = DATA_DIR / (data_dir or survey_id)
+
+    def _month_label(self):
+        names = [f"{calendar.month_name[m]} {y}" for y, m in self.months]
+        return names[0] if len(names) == 1 else f"{names[0]} – {names[-1]}"
+
+    @classmethod
+    def from_dict(cls, survey_id, spec):
+        return cls(
+            survey_id,
+            start=date.fromisoformat(spec["start"]),
+            end=date.fromisoformat(spec["end"]),
+            holidays=[date.fromisoformat(h) for h in spec.get("holidays", [])],
+            max_picks=spec.get("max_picks", 3),
+            weekdays=tuple(spec.get("weekdays", (0, 1, 2, 3, 4))),
+            title=spec.get("title"),
+            data_dir=spec.get("data_dir"),
+        )
+
+
+# ==========================================
+# Loading
+# ==========================================
+_surveys = None
+_default_id = None
+_load_lock = threading.Lock()
+
+
+def load_surveys(path=SURVEYS_FILE):
+    """
+    Parses the survey definitions file. Returns (surveys by id, default id).
+    Every survey keeps its data in DATA_DIR/<id>, or in the directory its
+    `data_dir` key names (relative to DATA_DIR), whichever survey is the default.
+    """
+    if path.exists():
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+    else:
+        config = DEFAULT_SURVEYS
+    default_id = config.get("default") or next(iter(config["surveys"]))
+    if default_id not in config["surveys"]:
+        raise ValueError(f"Default survey {default_id!r} is not defined")
+    surveys = {sid: Survey.from_dict(sid, spec) for sid, spec in config["surveys"].items()}
+    owners = {}
+    for survey in surveys.values():
+        other = owners.setdefault(survey.data_dir.resolve(), survey.id)
+        if other != survey.id:
+            raise ValueError(f"Surveys {other!r} and {survey.id!r} share the data directory {survey.data_dir}")
+    return surveys, default_id
+
+
+def get_survey(survey_id=None):
+    """
+    Returns a survey definition (the default one if no id is given), loaded
+    once per process. Raises KeyError for an unknown id.
+    """
+    global _surveys, _default_id
+    if _surveys is None:
+        with _load_lock:
+            if _surveys is None:
+                surveys, _default_id = load_surveys()
+                _surveys = surveys
+    return _surveys[survey_id or _default_id]
@@ -0,0 +1,182 @@
+import atexit
+import threading
+import time
+
+from storage import Submission, SubmissionStore, StorageError, normalize_name
+
+# ==========================================
+# Configuration
+# ==========================================
+# Seconds admin operations wait for the queue to be written before giving up
+FLUSH_TIMEOUT = 10.0
+
+# Retry delays after a failed write: doubling from the first up to the last
+RETRY_DELAY = 0.1
+RETRY_MAX_DELAY = 5.0
+
+# ==========================================
+# Write-behind Store
+# ==========================================
+class WriteBehindStore(SubmissionStore):
+    """
+    Wraps a store so that submissions are queued in memory and written by a
+    single background thread in batches.
+
+    Pending upserts are merged per name (last write wins) and flushed with
+    one `upsert_many` every `flush_interval` seconds, or as soon as
+    `max_batch` names are waiting. Reads of a single user see queued rows
+    (read-your-writes); aggregate reads see the backing store and lag by
+    at most one flush interval. Deletes flush the queue first, and the
+    queue is flushed on interpreter shutdown.
+
+    A failed write is retried with a growing delay. While the writer keeps
+    failing, `last_error` holds the error: new upserts are refused with a
+    StorageError, and flushes give up after `flush_timeout` seconds.
+    """
+
+    def __init__(self, store, flush_interval=0.005, max_batch=200, flush_timeout=FLUSH_TIMEOUT):
+        super().__init__()
+        self.store = store
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.flush_timeout = flush_timeout
+        self.last_error = None  # error of the last write, None once a write succeeded
+        self._pending = {}      # normalized name -> row, in arrival order
+        self._in_flight = {}    # batch currently being written
+        self._flush_now = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # --- Writer thread ---
+    def _run(self):
+        delay = RETRY_DELAY
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                # Give a burst a moment to coalesce into one batch
+                deadline = time.monotonic() + self.flush_interval
+                while len(self._pending) < self.max_batch and not (self._flush_now or self._closed):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._pending = self._pending, {}
+                self._in_flight = batch
+                self._flush_now = False
+
+            try:
+                self.store.upsert_many(list(batch.values()))
+            except Exception as e:
+                print(f"Error writing {len(batch)} queued submission(s), retrying in {delay:g}s: {e}")
+                with self._cond:
+                    self.last_error = e
+                    # Requeue, but anything submitted meanwhile is newer and wins
+                    batch.update(self._pending)
+                    self._pending = batch
+                    self._in_flight = {}
+                time.sleep(delay)
+                delay = min(delay * 2, RETRY_MAX_DELAY)
+                continue
+
+            delay = RETRY_DELAY
+            with self._cond:
+                self.last_error = None
+                self._in_flight = {}
+                self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """
+        Blocks until everything queued so far is written, at most `timeout`
+        seconds (default flush_timeout). Raises StorageError on expiry.
+        """
+        timeout = self.flush_timeout if timeout is None else timeout
+        with self._cond:
+            if self._pending:
+                self._flush_now = True
+                self._cond.notify_all()
+            if not self._cond.wait_for(lambda: not self._pending and not self._in_flight, timeout):
+                queued = len(self._pending) + len(self._in_flight)
+                reason = f": {self.last_error}" if self.last_error is not None else ""
+                raise StorageError(f"{queued} queued submission(s) not written after {timeout:g}s{reason}")
+
+    def close(self, timeout=10):
+        """Flushes the queue and stops the writer thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        if self._pending or self._in_flight:
+            names = sorted(row.name for row in {**self._in_flight, **self._pending}.values())
+            print(f"Write-behind queue closed with {len(names)} unwritten submission(s): {', '.join(names)}")
+
+    # --- Store interface ---
+    def subscribe(self, listener):
+        self.store.subscribe(listener)
+
+    def get(self, name):
+        key = normalize_name(name)
+        with self._cond:
+            row = self._pending.get(key) or self._in_flight.get(key)
+        return row if row is not None else self.store.get(name)
+
+    def upsert(self, name, dates, timestamp=None):
+        row = Submission.create(name, dates, timestamp)
+        with self._cond:
+            if self._closed:
+                raise StorageError("Write-behind queue is closed")
+            if self.last_error is not None:
+                raise StorageError(f"Queued submissions cannot be written: {self.last_error}")
+            key = normalize_name(name)
+            self._pending.pop(key, None)
+            self._pending[key] = row
+            if len(self._pending) == 1 or len(self._pending) >= self.max_batch:
+                self._cond.notify_all()
+        return row
+
+    def upsert_many(self, rows, keep_newer=False):
+        # Bulk writes (imports) go straight to the store, after what is queued
+        self.flush()
+        return self.store.upsert_many(rows, keep_newer)
+
+    def delete(self, names):
+        self.flush()
+        return self.store.delete(names)
+
+    def clear(self):
+        self.flush()
+        self.store.clear()
+
+    def iter_all(self):
+        return self.store.iter_all()
+
+    def count(self, name_prefix="", on_date=None):
+        return self.store.count(name_prefix, on_date)
+
+    def page(self, offset, limit, name_prefix="", on_date=None):
+        return self.store.page(offset, limit, name_prefix, on_date)
+
+    def search_names(self, name_prefix, limit):
+        return self.store.search_names(name_prefix, limit)
+
+    @property
+    def keeps_history(self):
+        return self.store.keeps_history
+
+    def history(self, name):
+        self.flush()
+        return self.store.history(name)
+
+    def version(self):
+        return self.store.version()
+
+    def changes_since(self, version):
+        return self.store.changes_since(version)
+
+    def read_all(self):
+        return self.store.read_all()
@@ -0,0 +1,346 @@
+"""
+Benchmarks for the survey's data path and page reruns.
+
+For each respondent count a synthetic submissions.csv is generated and
+imported into a fresh data directory, then the data path behind the app's
+functions is timed with direct calls, and full reruns of app.py are timed
+per page with Streamlit's AppTest. Each size runs in its own subprocess so
+peak memory is measured per size.
+
+Results (latency percentiles in ms, peak memory) are written as JSON to
+output/bench/ so runs can be compared between commits.
+
+Usage (from the DinnerSurvey directory):
+    python tools/bench.py                           # 10, 1k, 100k, 1M respondents
+    python tools/bench.py --sizes 10 1000 --repeat 50
+    python tools/bench.py --compare output/bench/<previous run>.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+SCRIPT_DIR = ROOT / "script"
+APP = SCRIPT_DIR / "app.py"
+OUTPUT_DIR = ROOT / "output" / "bench"
+
+DEFAULT_SIZES = [10, 1_000, 100_000, 1_000_000]
+
+
+# ==========================================
+# Helpers
+# ==========================================
+def generate_csv(path, n, days, seed=0):
+    """Writes a submissions.csv with `n` respondents picking 0-3 of `days`."""
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("Name,Date 1,Date 2,Date 3,Timestamp\n")
+        for i in range(n):
+            picks = rng.sample(days, rng.randint(0, 3)) + ["", "", ""]
+            f.write(f"voter{i:07d},{picks[0]},{picks[1]},{picks[2]},2026-01-01 12:00:00\n")
+
+
+def summarize(samples):
+    """Latency percentiles in milliseconds."""
+    if not samples:
+        return {"n": 0}
+    ms = sorted(s * 1000 for s in samples)
+
+    def pct(p):
+        return round(ms[min(len(ms) - 1, int(p / 100 * len(ms)))], 4)
+
+    return {
+        "n": len(ms),
+        "mean": round(sum(ms) / len(ms), 4),
+        "p50": pct(50),
+        "p90": pct(90),
+        "p99": pct(99),
+        "max": round(ms[-1], 4),
+    }
+
+
+def measure(fn, repeat, setup=None):
+    """Times `fn` `repeat` times (setup runs untimed before each call) and measures its peak allocation."""
+    samples = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        t = time.perf_counter()
+        fn(arg)
+        samples.append(time.perf_counter() - t)
+    result = summarize(samples)
+
+    # Separate pass: tracemalloc slows everything down, so keep it out of the timings
+    arg = setup() if setup else None
+    tracemalloc.start()
+    fn(arg)
+    result["peak_alloc_kb"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    tracemalloc.stop()
+    return result
+
+
+def peak_rss_kb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+# ==========================================
+# One Size (runs in a subprocess)
+# ==========================================
+def bench_functions(n, repeat, rng):
+    from stats import get_stats
+    from storage import get_store
+    from survey import get_survey
+
+    survey = get_survey()
+    t = time.perf_counter()
+    store = get_store(survey.data_dir)     # imports the generated CSV
+    import_s = time.perf_counter() - t
+    t = time.perf_counter()
+    get_stats(store)                        # startup rebuild of the tally
+    rebuild_s = time.perf_counter() - t
+
+    days = list(survey.selectable_days)
+
+    def random_name():
+        return f"voter{rng.randrange(n):07d}"
+
+    def render_statistics(_):
+        stats = get_stats(store)
+        stats.top(3)
+        stats.best_cover(survey.selectable_iso, 2)
+        stats.table(survey.selectable_iso)
+
+    def submit():
+        store.upsert(random_name(), rng.sample(days, 3))
+
+    results = {
+        "import_csv": {"seconds": round(import_s, 3)},
+        "stats_rebuild": {"seconds": round(rebuild_s, 3)},
+        "load_user_data": measure(lambda name: store.get(name), repeat, setup=random_name),
+        "save_submission": measure(lambda name: store.upsert(name, rng.sample(days, 3)), repeat, setup=random_name),
+        "render_statistics": measure(render_statistics, repeat),
+        "render_statistics_after_submit": measure(render_statistics, repeat, setup=submit),
+    }
+
+    def add_temp_voter():
+        name = f"temp{rng.randrange(1 << 30)}"
+        store.upsert(name, rng.sample(days, 2))
+        return name
+
+    def admin_delete(name):
+        store.delete([name])
+        get_stats(store)
+
+    results["admin_delete"] = measure(admin_delete, repeat, setup=add_temp_voter)
+
+    # What st.download_button does with the callable's result (imported outside the timing)
+    from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+
+    def export_csv(_):
+        convert_data_to_bytes_and_infer_mime(store.export_csv_bytes(), TypeError("unsupported export type"))
+
+    # A full export per call; keep the repeat count small
+    results["export_csv"] = measure(export_csv, max(1, repeat // 20))
+
+    from scoring import VoteMatrix
+
+    _, rows = store.read_all()
+
+    def score_respondents(_):
+        # The whole respondent matrix, rather than the tally's combinations
+        matrix = VoteMatrix.from_rows(survey.selectable_iso, rows)
+        matrix.counts()
+        matrix.best_date()
+        matrix.overlap()
+        matrix.best_cover(2)
+        matrix.best_cover(3)
+
+    results["score_respondents"] = measure(score_respondents, max(1, repeat // 20))
+    return results
+
+
+def bench_pages(repeat, timeout):
+    from streamlit.testing.v1 import AppTest
+
+    def app():
+        return AppTest.from_file(str(APP), default_timeout=timeout)
+
+    def login_page(_):
+        app().run()
+
+    def logged_in():
+        at = app().run()
+        at.text_input[0].set_value("voter0000000").run()
+        return at
+
+    def results_page():
+        at = app().run()
+        at.session_state.view_only = True
+        return at.run()
+
+    def admin_page():
+        at = app().run()
+        at.session_state.page = "admin"
+        at.session_state.admin_logged_in = True
+        return at.run()
+
+    pages = {"login": measure(login_page, repeat)}
+    for page, open_page in (("calendar", logged_in), ("results", results_page), ("admin", admin_page)):
+        at = open_page()
+        if at.exception:
+            raise RuntimeError(f"{page} page failed: {at.exception}")
+        pages[page] = measure(lambda _: at.run(), repeat)
+
+    # One click on a calendar day as a full script run (AppTest cannot run a
+    # single fragment), including any extra reruns the click triggers ...
+    from survey import get_survey
+    first = get_survey().selectable_days[0]
+    key = f"cal_btn_{first.year}_{first.month}_{first.day}"
+    at = logged_in()
+    pages["calendar_click"] = measure(lambda _: at.button(key=key).click().run(), repeat)
+
+    # ... and the work of the calendar fragment alone, which is what a
+    # click reruns in the browser
+    grid = AppTest.from_function(calendar_grid, default_timeout=timeout).run()
+    pages["calendar_click_fragment"] = measure(lambda _: grid.button(key=key).click().run(), repeat)
+    return pages
+
+
+def calendar_grid():
+    """AppTest script with only the calendar fragment of the survey page."""
+    from components import render_calendar
+    from survey import get_survey
+
+    render_calendar(get_survey())
+
+
+def run_size(n, repeat, page_repeat, timeout, seed):
+    rng = random.Random(seed)
+    results = {"respondents": n, "functions": bench_functions(n, repeat, rng)}
+    if page_repeat:
+        results["pages"] = bench_pages(page_repeat, timeout)
+    results["peak_rss_kb"] = peak_rss_kb()
+    return results
+
+
+# ==========================================
+# Orchestration
+# ==========================================
+def bench_size(n, args):
+    """Prepares a data directory for `n` respondents and benchmarks it in a subprocess."""
+    data_dir = Path(tempfile.mkdtemp(prefix=f"bench-{n}-"))
+    try:
+        surveys_file = ROOT / "data" / "surveys.json"
+        if surveys_file.exists():
+            shutil.copy(surveys_file, data_dir)
+
+        env = dict(os.environ, DINNER_SURVEY_DATA_DIR=str(data_dir))
+        info = json.loads(subprocess.check_output(
+            [sys.executable, __file__, "--survey-info"], env=env, text=True
+        ))
+        # The default survey's partition, inside data_dir
+        survey_dir = Path(info["data_dir"])
+        survey_dir.mkdir(parents=True, exist_ok=True)
+        generate_csv(survey_dir / "submissions.csv", n, info["days"], seed=args.seed)
+
+        cmd = [
+            sys.executable, __file__, "--worker", str(n),
+            "--repeat", str(args.repeat), "--page-repeat", str(args.page_repeat),
+            "--timeout", str(args.timeout), "--seed", str(args.seed),
+        ]
+        out = subprocess.run(cmd, env=env, check=True, stdout=subprocess.PIPE, text=True).stdout
+        return json.loads(out.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(report, baseline=None):
+    base = {}
+    if baseline:
+        base = {r["respondents"]: r for r in baseline["results"]}
+    for result in report["results"]:
+        n = result["respondents"]
+        print(f"\n== {n:,} respondents  (peak RSS {result['peak_rss_kb']} KB)")
+        for group in ("functions", "pages"):
+            for name, m in result.get(group, {}).items():
+                if "p50" not in m:
+                    print(f"  {name:32s} {m['seconds']:10.3f} s")
+                    continue
+                line = f"  {name:32s} p50 {m['p50']:9.3f} ms  p99 {m['p99']:9.3f} ms  peak {m['peak_alloc_kb']:9.1f} KB"
+                old = base.get(n, {}).get(group, {}).get(name)
+                if old and old.get("p50"):
+                    line += f"  ({m['p50'] / old['p50']:.2f}x p50 vs baseline)"
+                print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="respondent counts")
+    parser.add_argument("--repeat", type=int, default=200, help="calls per data path function")
+    parser.add_argument("--page-repeat", type=int, default=10, help="reruns per page (0 = skip AppTest)")
+    parser.add_argument("--timeout", type=float, default=600, help="AppTest timeout per rerun, seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON file to write (default: output/bench/<commit>-<time>.json)")
+    parser.add_argument("--compare", help="previous JSON result to compare p50 latencies against")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--survey-info", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.survey_info or args.worker is not None:
+        sys.path.insert(0, str(SCRIPT_DIR))
+        if args.survey_info:
+            from survey import get_survey
+            survey = get_survey()
+            print(json.dumps({"days": list(survey.selectable_iso), "data_dir": str(survey.data_dir.resolve())}))
+        else:
+            print(json.dumps(run_size(args.worker, args.repeat, args.page_repeat, args.timeout, args.seed)))
+        return
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "store": os.environ.get("DINNER_SURVEY_STORE", "sqlite"),
+        "results": [],
+    }
+    for n in args.sizes:
+        print(f"Benchmarking {n:,} respondents...", file=sys.stderr)
+        report["results"].append(bench_size(n, args))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_results(report, baseline)
+
+    output = Path(args.output) if args.output else OUTPUT_DIR / f"{report['commit'] or 'bench'}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
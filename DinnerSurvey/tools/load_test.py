@@ -0,0 +1,316 @@
+"""
+Load test: many concurrent voters against the real app.
+
+Runs N sessions against one fresh data directory. Every session
+repeatedly walks through the voter flow with Streamlit's AppTest, timing
+each script rerun:
+
+    open -> login (handle_login) -> calendar toggles -> submit (handle_submit) -> results
+
+AppTest installs a process-global mock runtime, so two AppTests cannot run
+at the same time in one process. By default every session runs in its own
+process. With --workers W the sessions are spread over W worker processes
+instead, each interleaving its sessions one rerun at a time, like a
+Streamlit server process that the GIL lets run one script at a time.
+Comparing several worker counts on the same data shows how a multi-worker
+deployment (see serve_multi.py) scales:
+
+    python tools/load_test.py --sessions 16 --workers 1 2 4
+
+Sessions of one worker share its store, tally and caches; separate workers
+keep theirs in sync through the store (cross-process catch-up). Every
+session votes under its own name, spelled differently each round, so the
+store must keep exactly one row per voter.
+
+Reports throughput, p50/p99 rerun latency per step, lost, stale and
+duplicated submissions, and time spent waiting for the data file lock.
+
+Usage (from the DinnerSurvey directory):
+    python tools/load_test.py --sessions 8 --rounds 5
+    python tools/load_test.py --sessions 16 --preload 100000 --store csv
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+from bench import summarize
+
+ROOT = Path(__file__).resolve().parent.parent
+SCRIPT_DIR = ROOT / "script"
+APP = SCRIPT_DIR / "app.py"
+
+STEPS = ("open", "login", "toggle", "submit", "results")
+
+
+# ==========================================
+# Helpers
+# ==========================================
+def spelling(name, round_no):
+    """The voter's name as typed in a given round: the same voter for normalize_name."""
+    return (name.upper(), f"  {name} ", name)[round_no % 3]
+
+
+class VoteFailed(Exception):
+    pass
+
+
+# ==========================================
+# One Session
+# ==========================================
+def visit(name, rng, days, max_picks, timeout, timings):
+    """
+    One visit through the voter flow, as a generator that yields after
+    every rerun so a worker can interleave its sessions. Appends (step,
+    seconds) to `timings` and returns the ISO dates the submission should
+    have saved.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(APP), default_timeout=timeout)
+
+    def rerun(step, element=None):
+        t = time.perf_counter()
+        (element.run() if element is not None else at.run())
+        timings.append((step, time.perf_counter() - t))
+        if at.exception:
+            raise VoteFailed(f"{step}: {at.exception[0].message}")
+
+    rerun("open")
+    yield
+    rerun("login", at.text_input(key="temp_name").set_value(name))
+    yield
+    for d in rng.sample(days, rng.randint(1, max_picks)):
+        rerun("toggle", at.button(key=f"cal_btn_{d.year}_{d.month}_{d.day}").click())
+        yield
+    expected = tuple(at.session_state.selection.to_iso())
+
+    submit = [b for b in at.button if "Submit" in b.label]
+    if not submit:
+        raise VoteFailed("no submit button")
+    rerun("submit", submit[0].click())
+    if not at.session_state.submitted:
+        errors = "; ".join(e.value for e in at.error) or "not submitted"
+        raise VoteFailed(f"submit: {errors}")
+    yield
+    # A refresh of the results page
+    rerun("results")
+    return expected
+
+
+def session(index, rounds, survey, timeout, seed, out):
+    """All visits of one session, as a generator (see visit); records the outcome in `out`."""
+    rng = random.Random(seed * 1_000_003 + index)
+    days = list(survey.selectable_days)
+    name = f"load-{index:04d}"
+    for r in range(rounds):
+        try:
+            out["expected"][name] = yield from visit(spelling(name, r), rng, days, survey.max_picks,
+                                                      timeout, out["timings"])
+            out["submits"] += 1
+        except VoteFailed as e:
+            out["failures"].append(f"{name} round {r}: {e}")
+
+
+def run_worker(indices, rounds, timeout, seed, start_at, results):
+    """One server process hosting the sessions `indices`, interleaved one rerun at a time."""
+    sys.path.insert(0, str(SCRIPT_DIR))
+    import metrics
+    from survey import get_survey
+
+    survey = get_survey()
+    out = {"timings": [], "expected": {}, "submits": 0, "failures": []}
+
+    # Server startup (imports, store, first tally) is not part of the test
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(str(APP), default_timeout=timeout).run()
+    at.session_state.view_only = True
+    at.run()
+    # Start together
+    time.sleep(max(0.0, start_at - time.time()))
+    start = time.perf_counter()
+    running = [session(i, rounds, survey, timeout, seed, out) for i in indices]
+    while running:
+        for s in list(running):
+            try:
+                next(s)
+            except StopIteration:
+                running.remove(s)
+    out["elapsed"] = time.perf_counter() - start
+
+    # Raw histograms of this process, for the lock contention report
+    with metrics.registry.lock:
+        out["storage"] = {f"{metric}{dict(labels)}": list(t) for (metric, labels), t in metrics.registry.timings.items()
+                          if metric in ("storage_lock_wait_seconds", "storage_write_seconds")}
+    results.put(out)
+
+
+# ==========================================
+# Orchestration
+# ==========================================
+def check_store(data_dir, expected, preload):
+    """Compares the store with the last vote of every session."""
+    sys.path.insert(0, str(SCRIPT_DIR))
+    from storage import normalize_name, open_store
+
+    rows = list(open_store(data_dir).iter_all())
+    keys = Counter(normalize_name(row.name) for row in rows)
+    stored = {normalize_name(row.name): row.dates for row in rows}
+    wanted = {normalize_name(name): dates for name, dates in expected.items()}
+    return {
+        "rows": len(rows),
+        "expected_rows": preload + len(wanted),
+        "lost": sorted(k for k in wanted if k not in stored),
+        "stale": sorted(k for k in wanted if k in stored and tuple(sorted(stored[k])) != wanted[k]),
+        "duplicated": sorted(k for k, n in keys.items() if n > 1),
+    }
+
+
+def contention(storage):
+    """Merges the storage histograms of all processes."""
+    merged = {}
+    for series, t in storage:
+        m = merged.setdefault(series, [0, 0.0, 0.0, 0])
+        m[0] += t[0]
+        m[1] += t[1]
+        m[2] = max(m[2], t[2])
+        m[3] += t[0] - t[3]     # slower than the first bucket (1 ms)
+    return {
+        series: {"count": c, "mean_ms": round(s / c * 1000, 3) if c else 0,
+                 "max_ms": round(mx * 1000, 2), "over_1ms": slow}
+        for series, (c, s, mx, slow) in sorted(merged.items())
+    }
+
+
+def run_load(args, workers=None):
+    """Runs the sessions on `workers` processes (None: one per session) and returns the report."""
+    if args.data_dir:
+        Path(args.data_dir).mkdir(parents=True, exist_ok=True)
+    data_dir = Path(tempfile.mkdtemp(prefix="load-", dir=args.data_dir))
+    surveys_file = ROOT / "data" / "surveys.json"
+    if surveys_file.exists() and not (data_dir / "surveys.json").exists():
+        shutil.copy(surveys_file, data_dir)
+
+    # Inherited by the server processes; metrics must be on before they import the app
+    os.environ["DINNER_SURVEY_DATA_DIR"] = str(data_dir)
+    os.environ["DINNER_SURVEY_STORE"] = args.store
+    os.environ["DINNER_SURVEY_METRICS_LOG"] = str(data_dir / "metrics.jsonl")
+    os.environ.setdefault("DINNER_SURVEY_METRICS_INTERVAL", "3600")
+
+    # The default survey's partition; this process keeps the DATA_DIR of its first run
+    sys.path.insert(0, str(SCRIPT_DIR))
+    from storage import DATA_DIR, open_store
+    from survey import get_survey
+    survey_dir = data_dir / get_survey().data_dir.relative_to(DATA_DIR)
+
+    if args.preload:
+        from bench import generate_csv
+        survey_dir.mkdir(parents=True, exist_ok=True)
+        generate_csv(survey_dir / "submissions.csv", args.preload, list(get_survey().selectable_iso), args.seed)
+        # Import (and create the schema) once, before the servers race for it
+        open_store(survey_dir)
+
+    ctx = mp.get_context("spawn")
+    results = ctx.Queue()
+    start_at = time.time() + args.warmup
+    workers = min(workers or args.sessions, args.sessions)
+    procs = [
+        ctx.Process(target=run_worker, args=(range(w, args.sessions, workers), args.rounds, args.timeout,
+                                             args.seed, start_at, results))
+        for w in range(workers)
+    ]
+    for p in procs:
+        p.start()
+    outputs = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    # Wall time from the common start to the last session done
+    elapsed = max(out["elapsed"] for out in outputs)
+
+    timings, expected, failures, storage = [], {}, [], []
+    for out in outputs:
+        timings += out["timings"]
+        expected.update(out["expected"])
+        failures += out["failures"]
+        storage += out["storage"].items()
+    submits = sum(out["submits"] for out in outputs)
+
+    return {
+        "store": args.store,
+        "sessions": args.sessions,
+        "workers": workers,
+        "rounds": args.rounds,
+        "preload": args.preload,
+        "elapsed_s": round(elapsed, 2),
+        "submits": submits,
+        "submits_per_s": round(submits / elapsed, 2),
+        "reruns_per_s": round(len(timings) / elapsed, 2),
+        "latency_ms": {step: summarize([s for name, s in timings if name == step]) for step in STEPS},
+        "failures": failures,
+        "integrity": check_store(survey_dir, expected, args.preload),
+        "contention": contention(storage),
+    }
+
+
+def print_report(report):
+    print(f"\n[{report['store']}] {report['sessions']} concurrent sessions on {report['workers']} worker(s), "
+          f"{report['rounds']} rounds, {report['preload']:,} preloaded voters")
+    print(f"  {report['submits']} submits in {report['elapsed_s']} s: "
+          f"{report['submits_per_s']} submits/s, {report['reruns_per_s']} reruns/s")
+    for step, m in report["latency_ms"].items():
+        if m["n"]:
+            print(f"  {step:8s} x{m['n']:<6d} p50 {m['p50']:9.2f} ms  p99 {m['p99']:9.2f} ms  max {m['max']:9.2f} ms")
+    check = report["integrity"]
+    print(f"  rows {check['rows']} (expected {check['expected_rows']})  lost {len(check['lost'])}  "
+          f"stale {len(check['stale'])}  duplicated {len(check['duplicated'])}  failed visits {len(report['failures'])}")
+    for failure in report["failures"][:10]:
+        print(f"    {failure}")
+    for series, c in report["contention"].items():
+        print(f"  {series}: {c['count']} x, mean {c['mean_ms']} ms, max {c['max_ms']} ms, {c['over_1ms']} over 1 ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent sessions")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        help="worker processes hosting the sessions; several counts are compared (default: one per session)")
+    parser.add_argument("--rounds", type=int, default=3, help="visits per session")
+    parser.add_argument("--preload", type=int, default=0, help="voters in the survey before the test")
+    parser.add_argument("--store", choices=["sqlite", "csv", "eventlog"], default="sqlite")
+    parser.add_argument("--timeout", type=float, default=120, help="AppTest timeout per rerun, seconds")
+    parser.add_argument("--warmup", type=float, default=10, help="seconds for the processes to start before the test")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", help="parent of the fresh data directory of each run (default: the temp dir)")
+    parser.add_argument("--output", help="also write the report as JSON to this file")
+    args = parser.parse_args()
+
+    reports = []
+    for workers in args.workers or [None]:
+        report = run_load(args, workers)
+        print_report(report)
+        reports.append(report)
+    if len(reports) > 1:
+        base = reports[0]["submits_per_s"]
+        print("\nScaling:")
+        for report in reports:
+            print(f"  {report['workers']:3d} worker(s): {report['submits_per_s']:8.2f} submits/s "
+                  f"({report['submits_per_s'] / base:.2f}x)")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(reports if len(reports) > 1 else reports[0], f, indent=2)
+    ok = all(
+        not (r["integrity"]["lost"] or r["integrity"]["stale"] or r["integrity"]["duplicated"] or r["failures"])
+        for r in reports
+    )
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
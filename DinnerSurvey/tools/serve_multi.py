@@ -0,0 +1,125 @@
+"""
+Runs the survey as several Streamlit worker processes on one host.
+
+Every worker is a separate `streamlit run script/app.py` on its own port,
+all sharing one data directory. The SQLite store (the default) keeps them
+consistent: writes are serialized by the database, and each worker's
+results cache catches up with the writes of the others through the
+store's revision counter and change log (see SQLiteStore.changes_since).
+
+Put a reverse proxy with sticky sessions in front of the ports: a
+Streamlit session lives in the memory of the worker that served its
+first request, so its websocket and uploads must keep reaching that
+worker. --nginx prints a matching nginx configuration.
+
+Usage (from the DinnerSurvey directory):
+    python tools/serve_multi.py --workers 4                   # ports 8501-8504
+    python tools/serve_multi.py --workers 4 --nginx > dinner-survey.conf
+    python tools/serve_multi.py --workers 2 -- --server.maxUploadSize 50
+"""
+import argparse
+import os
+import secrets
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+APP = ROOT / "script" / "app.py"
+
+NGINX_TEMPLATE = """\
+# Sticky sessions: a Streamlit session only exists on the worker that created it
+upstream dinner_survey {{
+    ip_hash;
+{servers}
+}}
+
+server {{
+    listen 80;
+
+    location / {{
+        proxy_pass http://dinner_survey;
+        proxy_http_version 1.1;
+        # Streamlit talks to the browser over a websocket (/_stcore/stream)
+        proxy_set_header Upgrade $http_upgrade;
+        proxy_set_header Connection "upgrade";
+        proxy_set_header Host $host;
+        proxy_read_timeout 86400;
+    }}
+}}
+"""
+
+
+def nginx_config(host, ports):
+    servers = "\n".join(f"    server {host}:{port};" for port in ports)
+    return NGINX_TEMPLATE.format(servers=servers)
+
+
+def worker_env(index, cookie_secret):
+    env = dict(os.environ)
+    # Uploads are XSRF-protected with a cookie signed by this secret; all
+    # workers need the same one or an upload fails on every other worker
+    env.setdefault("STREAMLIT_SERVER_COOKIE_SECRET", cookie_secret)
+    # One metrics endpoint per worker (DINNER_SURVEY_METRICS_PORT + index)
+    if env.get("DINNER_SURVEY_METRICS_PORT"):
+        env["DINNER_SURVEY_METRICS_PORT"] = str(int(env["DINNER_SURVEY_METRICS_PORT"]) + index)
+    return env
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes (default: CPUs)")
+    parser.add_argument("--port", type=int, default=8501, help="port of the first worker; the others follow")
+    parser.add_argument("--address", default="127.0.0.1", help="address the workers listen on")
+    parser.add_argument("--nginx", action="store_true", help="print an nginx configuration for the workers and exit")
+    parser.add_argument("streamlit_args", nargs="*", help="extra `streamlit run` options, after --")
+    args = parser.parse_args()
+
+    ports = [args.port + i for i in range(args.workers)]
+    if args.nginx:
+        print(nginx_config(args.address, ports))
+        return
+
+    store = os.environ.get("DINNER_SURVEY_STORE", "sqlite")
+    if store == "csv":
+        print("Warning: with the csv store every write rewrites the whole file and the other workers "
+              "re-read it; use sqlite (the default) for several workers.", file=sys.stderr)
+
+    cookie_secret = secrets.token_hex(32)
+    workers = []
+    for i, port in enumerate(ports):
+        cmd = [
+            sys.executable, "-m", "streamlit", "run", str(APP),
+            "--server.port", str(port), "--server.address", args.address,
+            "--server.headless", "true", *args.streamlit_args,
+        ]
+        workers.append(subprocess.Popen(cmd, cwd=ROOT, env=worker_env(i, cookie_secret)))
+    print(f"Started {len(workers)} worker(s) on {args.address}:{ports[0]}-{ports[-1]} ({store} store)",
+          file=sys.stderr)
+
+    def stop(*_):
+        for w in workers:
+            if w.poll() is None:
+                w.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        # A worker that dies takes the others down; let the service manager restart the group
+        while all(w.poll() is None for w in workers):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop()
+        for w in workers:
+            try:
+                w.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                w.kill()
+    sys.exit(max((w.returncode or 0) for w in workers))
+
+
+if __name__ == "__main__":
+    main()
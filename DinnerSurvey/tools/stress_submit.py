@@ -0,0 +1,129 @@
+"""
+Stress test for concurrent submissions.
+
+Spawns N processes x T threads that each submit repeatedly under their own
+name while a reader process keeps parsing the store, then checks that every
+submitter's last vote survived and that no reader ever saw partial data.
+
+Usage (from the DinnerSurvey directory):
+    python tools/stress_submit.py --backend csv --procs 8 --threads 4 --votes 25
+"""
+import argparse
+import multiprocessing as mp
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "script"))
+
+from eventlog import EventLogStore  # noqa: E402
+from storage import CsvStore, SQLiteStore, StorageError  # noqa: E402
+
+DAYS = [date(2026, 1, 5) + timedelta(days=i) for i in range(25)]
+
+
+def open_store(backend, data_dir):
+    if backend == "csv":
+        return CsvStore(Path(data_dir) / "submissions.csv")
+    if backend == "eventlog":
+        return EventLogStore(data_dir, snapshot_every=50)
+    return SQLiteStore(Path(data_dir) / "submissions.db", legacy_csv=None)
+
+
+def submitter(backend, data_dir, proc, threads, votes, results):
+    store = open_store(backend, data_dir)
+    last = {}
+
+    def run(t):
+        rng = random.Random(proc * 1000 + t)
+        name = f"p{proc}-t{t}"
+        for _ in range(votes):
+            dates = sorted(rng.sample(DAYS, rng.randint(1, 3)))
+            store.upsert(name, dates)
+            last[name] = tuple(d.isoformat() for d in dates)
+
+    workers = [threading.Thread(target=run, args=(t,)) for t in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    results.put(last)
+
+
+def reader(backend, data_dir, stop, results):
+    store = open_store(backend, data_dir)
+    reads = errors = 0
+    while not stop.is_set():
+        try:
+            for row in store.iter_all():
+                if not row.name or not row.timestamp:
+                    errors += 1
+            reads += 1
+        except StorageError:
+            errors += 1
+    results.put((reads, errors))
+
+
+def run_stress(backend, procs, threads, votes, data_dir):
+    Path(data_dir).mkdir(parents=True, exist_ok=True)
+    open_store(backend, data_dir)  # create schema before the workers race
+
+    results = mp.Queue()
+    read_results = mp.Queue()
+    stop = mp.Event()
+    rd = mp.Process(target=reader, args=(backend, data_dir, stop, read_results))
+    rd.start()
+
+    start = time.perf_counter()
+    workers = [
+        mp.Process(target=submitter, args=(backend, data_dir, p, threads, votes, results))
+        for p in range(procs)
+    ]
+    for w in workers:
+        w.start()
+    expected = {}
+    for _ in workers:
+        expected.update(results.get())
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    reads, read_errors = read_results.get()
+    rd.join()
+
+    stored = {row.name: row.dates for row in open_store(backend, data_dir).iter_all()}
+    lost = sorted(set(expected) - set(stored))
+    wrong = sorted(n for n in expected if n in stored and stored[n] != expected[n])
+    total = procs * threads * votes
+
+    print(f"[{backend}] {total} submits by {len(expected)} submitters in {elapsed:.2f}s "
+          f"({total / elapsed:.0f}/s)")
+    print(f"[{backend}] lost: {len(lost)}  stale: {len(wrong)}  "
+          f"reader passes: {reads}  reader errors: {read_errors}")
+    return not lost and not wrong and not read_errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["sqlite", "csv", "eventlog", "all"], default="all")
+    parser.add_argument("--procs", type=int, default=8)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--votes", type=int, default=25, help="submits per submitter")
+    parser.add_argument("--data-dir", help="directory for the store (default: a fresh temp dir)")
+    args = parser.parse_args()
+
+    backends = ["sqlite", "csv", "eventlog"] if args.backend == "all" else [args.backend]
+    ok = True
+    for backend in backends:
+        data_dir = args.data_dir or tempfile.mkdtemp(prefix=f"stress-{backend}-")
+        ok &= run_stress(backend, args.procs, args.threads, args.votes, data_dir)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()